@@ -23,7 +23,9 @@ database_url = f"postgresql+asyncpg://{user}:{password}@{host}/{database}"
 config.set_main_option("sqlalchemy.url", database_url)
 
 from app.admin.models import AdminModel
+from app.avatars.models import AvatarPhotoModel
 from app.chats.models import ChatModel
+from app.checkpoints.models import LongPollCheckpointModel
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,111 @@
+"""add players and games indexes
+
+Revision ID: 9e4b7a2c1f08
+Revises: 3f6a9b1c7d52
+Create Date: 2026-10-18 18:21:44.513902
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4b7a2c1f08"
+down_revision: Union[str, None] = "3f6a9b1c7d52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY keeps a running bot writing to the tables while the
+    # indexes build, and can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_players_game_id_status",
+            "players",
+            ["game_id", "status"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_players_game_id_user_id",
+            "players",
+            ["game_id", "user_id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_players_game_id_username",
+            "players",
+            ["game_id", "username"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_players_game_id_waiting",
+            "players",
+            ["game_id"],
+            postgresql_where=sa.text(
+                "NOT is_voted AND status IN ('voting', 'loser')"
+            ),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_games_chat_id_status_id",
+            "games",
+            ["chat_id", "status", "id"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_games_chat_id_in_progress",
+            "games",
+            ["chat_id"],
+            postgresql_where=sa.text("status = 'in_progress'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_games_chat_id_in_progress",
+            table_name="games",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_games_chat_id_status_id",
+            table_name="games",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_players_game_id_waiting",
+            table_name="players",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_players_game_id_username",
+            table_name="players",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_players_game_id_user_id",
+            table_name="players",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+        op.drop_index(
+            "ix_players_game_id_status",
+            table_name="players",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
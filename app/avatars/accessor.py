@@ -0,0 +1,109 @@
+import typing
+
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.base.base_accessor import BaseAccessor
+from app.base.cache import LRUCache
+from app.base.clock import utc_now
+from app.vk_api.dataclasses import Photo
+
+from .models import AvatarPhotoModel
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+class AvatarPhotoAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+
+        self.cache = LRUCache(maxsize=app.config.bot.avatar_cache_size)
+
+    async def get_by_avatar_url(
+        self, avatar_url: str
+    ) -> AvatarPhotoModel | None:
+        avatar_photo = self.cache.get(avatar_url)
+        if avatar_photo:
+            return avatar_photo
+
+        async with self.app.database.session() as session:
+            try:
+                query = select(AvatarPhotoModel).where(
+                    AvatarPhotoModel.avatar_url == avatar_url
+                )
+                result = await session.execute(query)
+                avatar_photo = result.scalars().first()
+            except SQLAlchemyError:
+                self.logger.error(
+                    "SQLAlchemyError while retrieving avatar photo"
+                )
+                raise
+
+        if avatar_photo:
+            self.cache.set(avatar_url, avatar_photo)
+        return avatar_photo
+
+    async def save_photo(
+        self, avatar_url: str, content_hash: str, photo: Photo
+    ) -> AvatarPhotoModel:
+        values = {
+            "content_hash": content_hash,
+            "owner_id": photo.owner_id,
+            "photo_id": photo.id,
+            "album_id": photo.album_id,
+            "checked_at": utc_now(),
+        }
+        async with self.app.database.session() as session:
+            query = (
+                insert(AvatarPhotoModel)
+                .values(avatar_url=avatar_url, **values)
+                .on_conflict_do_update(
+                    index_elements=[AvatarPhotoModel.avatar_url],
+                    set_=values,
+                )
+                .returning(AvatarPhotoModel)
+            )
+            try:
+                result = await session.execute(query)
+                avatar_photo = result.scalar_one()
+                await session.commit()
+                self.logger.info("Avatar photo saved successfully")
+            except SQLAlchemyError:
+                await session.rollback()
+                self.logger.error("SQLAlchemyError while saving avatar photo")
+                raise
+
+        self.cache.set(avatar_url, avatar_photo)
+        return avatar_photo
+
+    async def mark_checked(self, avatar_url: str) -> AvatarPhotoModel | None:
+        async with self.app.database.session() as session:
+            query = (
+                update(AvatarPhotoModel)
+                .values(checked_at=utc_now())
+                .where(AvatarPhotoModel.avatar_url == avatar_url)
+                .returning(AvatarPhotoModel)
+            )
+            try:
+                result = await session.execute(query)
+                avatar_photo = result.scalar_one_or_none()
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                self.logger.error(
+                    "SQLAlchemyError while revalidating avatar photo"
+                )
+                raise
+
+        if avatar_photo:
+            self.cache.set(avatar_url, avatar_photo)
+        return avatar_photo
+
+    def invalidate(self, avatar_url: str) -> None:
+        # Only the memory entry goes: the re-upload's save_photo overwrites
+        # the row. A DELETE here would run in the handler's unit of work
+        # and lock the row the re-upload tasks upsert from their own
+        # sessions, while the unit waits for them.
+        self.cache.pop(avatar_url)
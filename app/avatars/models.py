@@ -0,0 +1,22 @@
+import datetime
+
+from sqlalchemy import BigInteger
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import BaseModel, created_at
+
+
+class AvatarPhotoModel(BaseModel):
+    __tablename__ = "avatar_photos"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    avatar_url: Mapped[str] = mapped_column(unique=True)
+    content_hash: Mapped[str]
+
+    owner_id: Mapped[int] = mapped_column(BigInteger)
+    photo_id: Mapped[int] = mapped_column(BigInteger)
+    album_id: Mapped[int] = mapped_column(BigInteger)
+
+    checked_at: Mapped[datetime.datetime]
+    created_at: Mapped[created_at]
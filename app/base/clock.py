@@ -0,0 +1,6 @@
+import datetime
+
+
+def utc_now() -> datetime.datetime:
+    # Naive UTC, like the TIMEZONE('utc', now()) server defaults.
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
@@ -0,0 +1,32 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+__all__ = ("CODEC_NAME", "dumps", "dumps_bytes", "loads")
+
+if orjson is not None:
+    CODEC_NAME = "orjson"
+    DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=DUMPS_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        return dumps_bytes(obj).decode()
+
+    loads = orjson.loads
+else:
+    CODEC_NAME = "json"
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    def dumps(obj: Any) -> str:
+        return _encoder.encode(obj)
+
+    def dumps_bytes(obj: Any) -> bytes:
+        return dumps(obj).encode()
+
+    loads = json.loads
@@ -82,32 +82,6 @@ IDLE_START_GAME_MESSAGE = """
 ⏳ Ожидание начала игры...
 """
 
-MAIN_KEYBOARD = {
-    "one_time": False,
-    "buttons": [
-        [
-            {
-                "action": {
-                    "type": "callback",
-                    "payload": '{"button": "start_game"}',
-                    "label": "Начать игру",
-                },
-                "color": "positive",
-            }
-        ],
-        [
-            {
-                "action": {
-                    "type": "callback",
-                    "payload": '{"button": "get_last_game"}',
-                    "label": "Показать последнюю игру",
-                },
-                "color": "secondary",
-            }
-        ],
-    ],
-}
-
 NEW_GAME_WARNING_MESSAGE = """
 ❌ Ошибка: для начала игры нужно хотя бы трое игроков!
 
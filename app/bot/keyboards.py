@@ -0,0 +1,57 @@
+from functools import lru_cache
+
+from app.base import codec
+from app.bot.enums import PayloadButton
+
+VOTING_KEYBOARDS_CACHE_SIZE = 1024
+
+
+def callback_button(label: str, button: str, color: str, **payload) -> dict:
+    return {
+        "action": {
+            "type": "callback",
+            "payload": codec.dumps({"button": button, **payload}),
+            "label": label,
+        },
+        "color": color,
+    }
+
+
+def encode_keyboard(buttons: list[list[dict]]) -> str:
+    return codec.dumps({"one_time": False, "buttons": buttons})
+
+
+MAIN_KEYBOARD = encode_keyboard(
+    [
+        [
+            callback_button(
+                "Начать игру", PayloadButton.start_game, "positive"
+            ),
+        ],
+        [
+            callback_button(
+                "Показать последнюю игру",
+                PayloadButton.get_last_game,
+                "secondary",
+            ),
+        ],
+    ]
+)
+
+CANCEL_GAME_BUTTON = callback_button(
+    "Закончить игру", PayloadButton.cancel_game, "negative"
+)
+
+
+@lru_cache(maxsize=VOTING_KEYBOARDS_CACHE_SIZE)
+def voting_keyboard(player1: tuple[int, str], player2: tuple[int, str]) -> str:
+    # Players are (id, username): votes are counted by player id.
+    return encode_keyboard(
+        [
+            [
+                callback_button(username, username, "primary", player_id=id_)
+                for id_, username in (player1, player2)
+            ],
+            [CANCEL_GAME_BUTTON],
+        ]
+    )
@@ -1,10 +1,9 @@
+import asyncio
 import typing
 from logging import getLogger
 
-from app.chats.models import ChatModel
 from app.vk_api.dataclasses import Event, Message, Payload, Update
 
-from .states.base.base import BaseState
 from .states.base.context import StateContext
 
 if typing.TYPE_CHECKING:
@@ -16,39 +15,87 @@ class BotManager:
         self.app = app
         self.bot = None
         self.logger = getLogger("handler")
-        self.chat: None | ChatModel = None
-        self.state_context: None | StateContext = None
-        self.current_state: None | BaseState = None
+        self.semaphore = asyncio.Semaphore(
+            app.config.bot.max_concurrent_chats,
+        )
+        self.chat_locks: dict[int, asyncio.Lock] = {}
+        self.chat_lock_users: dict[int, int] = {}
 
     async def handle_updates(self, updates: list[Update]) -> None:
-        event_obj, message_obj = None, None
+        updates_by_chat: dict[int, list[Update]] = {}
         for update in updates:
-            if update.object.message:
-                chat_id = update.object.message.peer_id
-                message_obj = Message(
+            updates_by_chat.setdefault(self.get_chat_id(update), []).append(
+                update
+            )
+
+        await asyncio.gather(
+            *(
+                self._handle_chat_updates(chat_id, chat_updates)
+                for chat_id, chat_updates in updates_by_chat.items()
+            )
+        )
+
+    async def handle_update(self, update: Update) -> None:
+        await self._handle_chat_updates(self.get_chat_id(update), [update])
+
+    async def _handle_chat_updates(
+        self, chat_id: int, updates: list[Update]
+    ) -> None:
+        self.chat_lock_users[chat_id] = self.chat_lock_users.get(chat_id, 0) + 1
+        lock = self.chat_locks.setdefault(chat_id, asyncio.Lock())
+        try:
+            async with lock, self.semaphore:
+                for update in updates:
+                    try:
+                        await self._dispatch(chat_id, update)
+                    except Exception:
+                        self.logger.exception(
+                            "Error during handling update for chat_id=%s",
+                            chat_id,
+                        )
+        finally:
+            self.chat_lock_users[chat_id] -= 1
+            if not self.chat_lock_users[chat_id]:
+                del self.chat_lock_users[chat_id]
+                del self.chat_locks[chat_id]
+
+    async def _dispatch(self, chat_id: int, update: Update) -> None:
+        # The handler and every state transition it triggers share one
+        # session and commit together.
+        async with self.app.database.unit_of_work():
+            await self._handle(chat_id, update)
+
+    async def _handle(self, chat_id: int, update: Update) -> None:
+        state_context = StateContext(
+            app=self.app,
+            chat_id=chat_id,
+        )
+        message = update.object.message
+        if message and message.action:
+            await self.app.store.vk_api.roster.apply_action(
+                chat_id, message.action, message.from_id
+            )
+        current_state = await state_context.get_state()
+        if update.object.message:
+            await current_state.handle_message(
+                message_obj=Message(
                     text=update.object.message.text,
-                )
-            else:
-                chat_id = update.object.peer_id
-                event_obj = Event(
+                ),
+            )
+        else:
+            await current_state.handle_events(
+                event_obj=Event(
                     event_id=update.object.event_id,
                     from_id=update.object.user_id,
                     peer_id=update.object.peer_id,
                     payload=Payload(
                         button=update.object.payload.button,
                     ),
-                )
-
-        self.state_context = StateContext(
-            app=self.app,
-            chat_id=chat_id,
-        )
-        self.current_state = await self.state_context.get_state()
-        if event_obj:
-            await self.current_state.handle_events(
-                event_obj=event_obj,
-            )
-        elif message_obj:
-            await self.current_state.handle_message(
-                message_obj=message_obj,
+                ),
             )
+
+    @staticmethod
+    def get_chat_id(update: Update) -> int:
+        if update.object.message:
+            return update.object.message.peer_id
+        return update.object.peer_id
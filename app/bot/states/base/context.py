@@ -20,10 +20,10 @@ class StateContext:
     async def _get_current_state(self, chat_id: int) -> "BaseState":
         from .states import states  # noqa: PLC0415
 
-        chat = await self.app.store.chats.get_or_create_chat(
+        bot_state = await self.app.store.chats.get_bot_state(
             chat_id=chat_id,
         )
-        return states[chat.bot_state](
+        return states[bot_state](
             context=self,
         )
 
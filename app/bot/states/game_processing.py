@@ -6,9 +6,11 @@ from app.bot.bot_messages import (
     GAME_PROCESSING_WINNER_MESSAGE,
 )
 from app.bot.enums import PayloadButton
+from app.bot.keyboards import voting_keyboard
 from app.bot.states.base.base import BaseState
 from app.chats.models import ChatState
 from app.games.models import GameStatus
+from app.players.dataclasses import RoundResult
 from app.players.models import PlayerModel, PlayerStatus
 from app.vk_api.dataclasses import Event, Message
 
@@ -50,7 +52,7 @@ class BotGameProcessingState(BaseState):
             player2,
         )
         await self._send_keyboard(
-            players=[player1.username, player2.username],
+            players=[player1, player2],
         )
 
     async def handle_events(self, event_obj: Event) -> None:
@@ -73,41 +75,38 @@ class BotGameProcessingState(BaseState):
                 },
             )
             return
-        player = event_obj.payload.button
-        user_voted_id = event_obj.from_id
-
-        user = await self.app.store.players.get_player_by_user_id(
-            game_id=game.id,
-            user_id=user_voted_id,
-        )
-        if not user.is_voted and (
-            user.status == PlayerStatus.voting
-            or user.status == PlayerStatus.loser
-        ):
-            await self.app.store.players.update_voted(
+        player_id = event_obj.payload.player_id
+        if player_id is None:
+            # Keyboards sent before votes were counted by player id.
+            player_id = await self._player_id_by_username(
                 game_id=game.id,
-                player_id=user.id,
-                new_voted=True,
+                username=event_obj.payload.button,
             )
-            await self.app.store.players.update_votes_by_username(
-                username=player,
-                game_id=game.id,
+        if player_id is None:
+            # A stale keyboard or a renamed user: nothing to vote for.
+            await self.app.store.vk_api.send_event_answer(
+                event_obj=event_obj,
             )
-        else:
-            await self._send_vote_warning(
-                username_voted=user.username,
+            return
+        vote = await self.app.store.players.cast_vote(
+            game_id=game.id,
+            user_id=event_obj.from_id,
+            player_id=player_id,
+        )
+        if not vote.accepted:
+            user = await self.app.store.players.get_player_by_user_id(
+                game_id=game.id,
+                user_id=event_obj.from_id,
             )
+            if user:
+                await self._send_vote_warning(
+                    username_voted=user.username,
+                )
 
-        if await self.app.store.players.check_all_votes_true_for_game(
-            game_id=game.id,
-        ):
+        if vote.accepted and vote.all_voted:
             await self.context.change_current_state(
                 new_state=ChatState.round_processing,
             )
-            await self.app.store.vk_api.send_event_answer(
-                event_obj=event_obj,
-            )
-            return
         await self.app.store.vk_api.send_event_answer(
             event_obj=event_obj,
         )
@@ -121,20 +120,12 @@ class BotGameProcessingState(BaseState):
                 chat_id=self.chat_id,
                 status=GameStatus.in_progress,
             )
-            player_winner = (
-                await self.app.store.players.get_player_with_max_votes(
-                    game_id=game.id,
-                )
-            )
-            player_loser = (
-                await self.app.store.players.get_player_with_min_votes(
-                    game_id=game.id,
-                )
+            round_result = await self.app.store.players.get_round_result(
+                game_id=game.id,
             )
             await self._send_result(
                 game=game,
-                winner=player_winner,
-                loser=player_loser,
+                round_result=round_result,
             )
         elif (
             to_state != ChatState.game_finished
@@ -145,32 +136,19 @@ class BotGameProcessingState(BaseState):
             )
 
     async def _send_avatars(self, player1, player2) -> None:
-        upload_photo_player1 = await self.app.store.vk_api.upload_photo(
-            image_url=player1.avatar_url,
-        )
-        upload_photo_player2 = await self.app.store.vk_api.upload_photo(
-            image_url=player2.avatar_url,
-        )
-
-        player1_photo = await self.app.store.vk_api.save_photo(
-            upload_photo_player1,
-        )
-        player2_photo = await self.app.store.vk_api.save_photo(
-            upload_photo_player2,
-        )
-
-        await self.app.store.vk_api.send_photos(
-            [player1_photo, player2_photo],
+        await self.app.store.vk_api.photo_pipeline.send_photos(
+            [player1.avatar_url, player2.avatar_url],
             peer_id=self.chat_id,
         )
 
     async def _send_result(
         self,
         game,
-        winner: PlayerModel,
-        loser: PlayerModel,
+        round_result: RoundResult,
     ):
-        if winner.votes != loser.votes:
+        winner = round_result.winner
+        loser = round_result.loser
+        if not round_result.is_tie:
             await self.app.store.players.update_player_status(
                 game_id=game.id,
                 player_id=winner.id,
@@ -217,52 +195,33 @@ class BotGameProcessingState(BaseState):
 
     async def _send_keyboard(
         self,
-        players: list[str],
+        players: list[PlayerModel],
     ):
-        keyboard = {
-            "one_time": False,
-            "buttons": [
-                [
-                    {
-                        "action": {
-                            "type": "callback",
-                            "payload": f'{{"button": "{players[0]}"}}',
-                            "label": players[0],
-                        },
-                        "color": "primary",
-                    },
-                    {
-                        "action": {
-                            "type": "callback",
-                            "payload": f'{{"button": "{players[1]}"}}',
-                            "label": players[1],
-                        },
-                        "color": "primary",
-                    },
-                ],
-                [
-                    {
-                        "action": {
-                            "type": "callback",
-                            "payload": '{"button": "cancel_game"}',
-                            "label": "Закончить игру",
-                        },
-                        "color": "negative",
-                    },
-                ],
-            ],
-        }
-
         await self.app.store.vk_api.send_message(
             message=Message(
                 GAME_PROCESSING_START_VOTING.format(
-                    username1=players[0],
-                    username2=players[1],
+                    username1=players[0].username,
+                    username2=players[1].username,
                 ),
             ),
             peer_id=self.chat_id,
-            keyboard=keyboard,
+            keyboard=voting_keyboard(
+                (players[0].id, players[0].username),
+                (players[1].id, players[1].username),
+            ),
+        )
+
+    async def _player_id_by_username(
+        self, game_id: int, username: str
+    ) -> int | None:
+        players = await self.app.store.players.get_players_by_status(
+            game_id=game_id,
+            status=PlayerStatus.in_game,
         )
+        for player in players:
+            if player.username == username:
+                return player.id
+        return None
 
     async def _send_cancel_game_result(self, user_id: int):
         await self.app.store.vk_api.send_message(
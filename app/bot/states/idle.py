@@ -6,9 +6,9 @@ from app.bot.bot_messages import (
     IDLE_START_GAME_MESSAGE,
     IDLE_UNKNOWN_COMMAND,
     IDLE_WITH_KEYBOARD_MESSAGE,
-    MAIN_KEYBOARD,
 )
 from app.bot.enums import PayloadButton
+from app.bot.keyboards import MAIN_KEYBOARD
 from app.bot.states.base.base import BaseState
 from app.chats.models import ChatState
 from app.players.models import PlayerStatus
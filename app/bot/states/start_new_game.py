@@ -4,8 +4,11 @@ from app.bot.bot_messages import (
 )
 from app.bot.states.base.base import BaseState
 from app.chats.models import ChatState
+from app.games.models import GameModel
 from app.players.models import PlayerModel
-from app.vk_api.dataclasses import Message, ProfileList
+from app.vk_api.dataclasses import Message, Profile
+
+MIN_PLAYERS_COUNT = 3
 
 
 class BotStartNewGameState(BaseState):
@@ -13,22 +16,20 @@ class BotStartNewGameState(BaseState):
 
     async def on_state_enter(self, from_state: ChatState, **kwargs) -> None:
         try:
-            profiles = await self._get_profiles()
+            game = await self._create_game_from_members()
         except Exception:
+            # A members page can fail after the game and some players are
+            # already created.
+            await self.app.store.games.cancel_in_progress_game(
+                chat_id=self.chat_id,
+            )
             await self._send_permission_warning()
             await self.context.change_current_state(
                 new_state=ChatState.idle,
             )
             return
 
-        if len(profiles) > 2:
-            game = await self.app.store.games.create_game(
-                chat_id=self.chat_id,
-            )
-            await self._create_players(
-                profiles=profiles,
-                game_id=game.id,
-            )
+        if game is not None:
             await self.context.change_current_state(
                 new_state=ChatState.round_processing,
             )
@@ -38,25 +39,33 @@ class BotStartNewGameState(BaseState):
                 new_state=ChatState.idle,
             )
 
+    async def _create_game_from_members(self) -> GameModel | None:
+        members = self.app.store.vk_api.roster.iter_profiles(
+            peer_id=self.chat_id,
+        )
+        game = None
+        pending = []
+        async for profiles in members:
+            pending.extend(profiles)
+            if game is None and len(pending) >= MIN_PLAYERS_COUNT:
+                game = await self.app.store.games.create_game(
+                    chat_id=self.chat_id,
+                )
+            if game is not None and pending:
+                await self._create_players(
+                    profiles=pending,
+                    game_id=game.id,
+                )
+                pending = []
+        return game
+
     async def _create_players(
-        self, profiles: ProfileList, game_id: int
+        self, profiles: list[Profile], game_id: int
     ) -> list[PlayerModel]:
-        players = []
-        for profile in profiles:
-            player = await self.app.store.players.create_player(
-                user_id=profile.id,
-                username=profile.screen_name,
-                avatar_url=profile.photo_100,
-                game_id=game_id,
-            )
-            players.append(player)
-        return players
-
-    async def _get_profiles(self):
-        members = await self.app.store.vk_api.get_chat_members(
-            peer_id=self.chat_id,
+        return await self.app.store.players.create_players(
+            profiles=profiles,
+            game_id=game_id,
         )
-        return members.profiles
 
     async def _send_count_players_warning(self):
         await self.app.store.vk_api.send_message(
@@ -1,12 +1,45 @@
+import typing
+
 from sqlalchemy import select, update
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app.base.base_accessor import BaseAccessor
+from app.base.cache import LRUCache
+from app.web.config import UpdatesMode
+
+from .models import ChatModel, ChatState
 
-from .models import ChatModel
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
 
 
 class ChatAccessor(BaseAccessor):
+    def __init__(self, app: "Application", *args, **kwargs):
+        super().__init__(app, *args, **kwargs)
+
+        # Bot states by chat_id. Every transition goes through
+        # update_bot_state, which writes the new state through.
+        self.states = LRUCache(maxsize=app.config.bot.chat_state_cache_size)
+
+    @property
+    def caches_states(self) -> bool:
+        # Callback mode can run several replicas behind a balancer, and a
+        # state cached by one goes stale once another moves the chat on.
+        return self.app.config.bot.updates_mode != UpdatesMode.callback
+
+    async def get_bot_state(self, chat_id: int) -> ChatState:
+        if not self.caches_states:
+            chat = await self.get_or_create_chat(chat_id=chat_id)
+            return chat.bot_state
+        bot_state = self.states.get(chat_id)
+        if bot_state is None:
+            chat = await self.get_or_create_chat(chat_id=chat_id)
+            bot_state = chat.bot_state
+            self.states.set(chat_id, bot_state)
+            # The chat may have just been created by an uncommitted unit.
+            self.app.database.on_rollback(lambda: self.states.pop(chat_id))
+        return bot_state
+
     async def get_or_create_chat(
         self, chat_id: int, bot_state: str | None = None
     ) -> ChatModel:
@@ -69,26 +102,36 @@ class ChatAccessor(BaseAccessor):
             )
             try:
                 result = await session.execute(query)
+                chat = result.scalar_one()
                 await session.commit()
+                if self.caches_states:
+                    self.states.set(chat_id, chat.bot_state)
+                    # Inside a unit of work the state is only flushed so far.
+                    self.app.database.on_rollback(
+                        lambda: self.states.pop(chat_id)
+                    )
                 self.logger.info(
                     "Bot state updated successfully for chat_id=%s", chat_id
                 )
-                return result.scalar_one()
             except IntegrityError:
+                self.states.pop(chat_id)
                 await session.rollback()
                 self.logger.error(
                     "IntegrityError occurred while updating bot state"
                 )
                 raise
             except SQLAlchemyError:
+                self.states.pop(chat_id)
                 await session.rollback()
                 self.logger.error(
                     "SQLAlchemyError occurred while updating bot state"
                 )
                 raise
             except Exception:
+                self.states.pop(chat_id)
                 await session.rollback()
                 self.logger.error(
                     "Unexpected error occurred while updating bot state"
                 )
                 raise
+            return chat
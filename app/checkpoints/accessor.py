@@ -0,0 +1,46 @@
+from sqlalchemy import func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.base.base_accessor import BaseAccessor
+
+from .models import LongPollCheckpointModel
+
+
+class CheckpointAccessor(BaseAccessor):
+    async def get_ts(self, group_id: int) -> int | None:
+        async with self.app.database.session() as session:
+            try:
+                query = select(LongPollCheckpointModel.ts).where(
+                    LongPollCheckpointModel.group_id == group_id
+                )
+                result = await session.execute(query)
+                return result.scalar_one_or_none()
+            except SQLAlchemyError:
+                self.logger.error(
+                    "SQLAlchemyError while retrieving long poll checkpoint"
+                )
+                raise
+
+    async def save_ts(self, group_id: int, ts: int) -> None:
+        query = insert(LongPollCheckpointModel).values(group_id=group_id, ts=ts)
+        # Workers can finish out of order, the checkpoint never moves back.
+        query = query.on_conflict_do_update(
+            index_elements=[LongPollCheckpointModel.group_id],
+            set_={
+                "ts": func.greatest(
+                    LongPollCheckpointModel.ts, query.excluded.ts
+                ),
+                "updated_at": text("TIMEZONE('utc', now())"),
+            },
+        )
+        async with self.app.database.session() as session:
+            try:
+                await session.execute(query)
+                await session.commit()
+            except SQLAlchemyError:
+                await session.rollback()
+                self.logger.error(
+                    "SQLAlchemyError while saving long poll checkpoint"
+                )
+                raise
@@ -0,0 +1,17 @@
+import datetime
+
+from sqlalchemy import BigInteger, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.database.base import BaseModel
+
+
+class LongPollCheckpointModel(BaseModel):
+    __tablename__ = "long_poll_checkpoints"
+
+    group_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    ts: Mapped[int] = mapped_column(BigInteger)
+
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        server_default=text("TIMEZONE('utc', now())"),
+    )
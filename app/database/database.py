@@ -1,7 +1,12 @@
+import asyncio
 import typing
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from typing import Any
 
-from sqlalchemy import URL
+from sqlalchemy import URL, event
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
@@ -15,6 +20,65 @@ from .base import BaseModel
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
+UNIT_OF_WORK_KEY = "unit_of_work"
+
+
+@dataclass
+class UnitOfWorkStats:
+    units: int = 0
+    rolled_back: int = 0
+    statements: int = 0
+    last_statements: int = 0
+    max_statements: int = 0
+
+    @property
+    def statements_per_unit(self) -> float:
+        if not self.units:
+            return 0.0
+        return self.statements / self.units
+
+    def add(self, statements: int, rolled_back: bool) -> None:
+        self.units += 1
+        self.rolled_back += rolled_back
+        self.statements += statements
+        self.last_statements = statements
+        self.max_statements = max(self.max_statements, statements)
+
+
+class UnitOfWork:
+    """Session shared by every accessor call of one task.
+
+    Accessors keep their `async with database.session()` blocks: inside a
+    unit they get this object, whose commit only flushes and whose context
+    manager leaves the session open. The unit commits once at the end.
+    """
+
+    def __init__(self, session: AsyncSession, connection_info: dict) -> None:
+        self.session = session
+        self.connection_info = connection_info
+        self.task = asyncio.current_task()
+        self.statements = 0
+        self.failed = False
+        self.rollback_callbacks: list[Callable[[], Any]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        return
+
+    async def commit(self) -> None:
+        await self.session.flush()
+
+    async def rollback(self) -> None:
+        # The unit can't commit a part of its work any more.
+        self.failed = True
+        self.connection_info.pop(UNIT_OF_WORK_KEY, None)
+        await self.session.rollback()
+
 
 class Database:
     def __init__(self, app: "Application") -> None:
@@ -22,7 +86,12 @@ class Database:
 
         self.engine: AsyncEngine | None = None
         self._db: type[DeclarativeBase] = BaseModel
-        self.session: async_sessionmaker[AsyncSession] | None = None
+        self.sessionmaker: async_sessionmaker[AsyncSession] | None = None
+        self.units: asyncio.Semaphore | None = None
+        self.current_unit: ContextVar[UnitOfWork | None] = ContextVar(
+            "current_unit", default=None
+        )
+        self.stats = UnitOfWorkStats()
 
     async def connect(self, *args: Any, **kwargs: Any) -> None:
         user = self.app.config.database.user
@@ -40,8 +109,69 @@ class Database:
                 port=port,
                 database=database,
             ),
+            pool_size=self.app.config.database.pool_size,
+            max_overflow=self.app.config.database.max_overflow,
         )
-        self.session = async_sessionmaker(self.engine, expire_on_commit=False)
+        event.listen(
+            self.engine.sync_engine,
+            "before_cursor_execute",
+            self._count_statement,
+        )
+        self.sessionmaker = async_sessionmaker(
+            self.engine, expire_on_commit=False
+        )
+        # Units never take the overflow connections, which stay free for
+        # the sessions opened beside them.
+        self.units = asyncio.Semaphore(self.app.config.database.pool_size)
 
     async def disconnect(self, *args: Any, **kwargs: Any) -> None:
-        await self.session().close()
+        await self.engine.dispose()
+
+    def session(self) -> AsyncSession | UnitOfWork:
+        return self._active_unit() or self.sessionmaker()
+
+    def _active_unit(self) -> UnitOfWork | None:
+        # Tasks spawned by a handler inherit its context, but must not share
+        # its session: an AsyncSession can't run concurrent operations.
+        unit = self.current_unit.get()
+        if unit is not None and unit.task is asyncio.current_task():
+            return unit
+        return None
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[UnitOfWork]:
+        if unit := self._active_unit():
+            yield unit
+            return
+
+        async with self.units, self.sessionmaker() as session:
+            connection = await session.connection()
+            unit = UnitOfWork(session, connection.info)
+            connection.info[UNIT_OF_WORK_KEY] = unit
+            token = self.current_unit.set(unit)
+            try:
+                yield unit
+                if unit.failed:
+                    await session.rollback()
+                else:
+                    await session.commit()
+            except BaseException:
+                unit.failed = True
+                await session.rollback()
+                raise
+            finally:
+                self.current_unit.reset(token)
+                unit.connection_info.pop(UNIT_OF_WORK_KEY, None)
+                self.stats.add(unit.statements, unit.failed)
+                if unit.failed:
+                    for callback in unit.rollback_callbacks:
+                        callback()
+
+    def on_rollback(self, callback: Callable[[], Any]) -> None:
+        if unit := self._active_unit():
+            unit.rollback_callbacks.append(callback)
+
+    def _count_statement(self, conn, *args: Any) -> None:
+        unit = conn.info.get(UNIT_OF_WORK_KEY)
+        if unit is not None:
+            unit.statements += 1
@@ -68,6 +68,7 @@ class GameAccessor(BaseAccessor):
                     .where(GameModel.chat_id == chat_id)
                     .where(GameModel.status == GameStatus.finished)
                     .order_by(GameModel.id.desc())
+                    .limit(1)
                 )
                 result = await session.execute(query)
                 game = result.scalars().first()
@@ -3,7 +3,7 @@ import typing
 from enum import StrEnum, auto
 from typing import Optional
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.base import BaseModel, created_at
@@ -21,6 +21,16 @@ class GameStatus(StrEnum):
 
 class GameModel(BaseModel):
     __tablename__ = "games"
+    __table_args__ = (
+        Index("ix_games_chat_id_status_id", "chat_id", "status", "id"),
+        # A chat has at most one game in progress, and every update of a
+        # running game looks it up.
+        Index(
+            "ix_games_chat_id_in_progress",
+            "chat_id",
+            postgresql_where=text("status = 'in_progress'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -1,10 +1,15 @@
-from sqlalchemy import or_, select, update
+from sqlalchemy import exists, func, insert, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from app.base.base_accessor import BaseAccessor
+from app.vk_api.dataclasses import Profile
 
+from .dataclasses import RoundPlayer, RoundResult, VoteResult
 from .models import PlayerModel, PlayerStatus
 
+VOTER_STATUSES = (PlayerStatus.voting, PlayerStatus.loser)
+
 
 class PlayerAccessor(BaseAccessor):
     async def create_player(
@@ -35,6 +40,35 @@ class PlayerAccessor(BaseAccessor):
                 raise
             return player
 
+    async def create_players(
+        self, profiles: list[Profile], game_id: int
+    ) -> list[PlayerModel]:
+        if not profiles:
+            return []
+        async with self.app.database.session() as session:
+            query = insert(PlayerModel).returning(PlayerModel)
+            values = [
+                {
+                    "user_id": profile.id,
+                    "username": profile.screen_name,
+                    "avatar_url": profile.photo_100,
+                    "game_id": game_id,
+                }
+                for profile in profiles
+            ]
+            try:
+                result = await session.scalars(query, values)
+                players = list(result)
+                await session.commit()
+                self.logger.info(
+                    "%s players created successfully", len(players)
+                )
+            except SQLAlchemyError:
+                await session.rollback()
+                self.logger.error("SQLAlchemyError while creating players")
+                raise
+            return players
+
     async def get_player_by_id(self, player_id: int) -> PlayerModel | None:
         async with self.app.database.session() as session:
             try:
@@ -139,67 +173,63 @@ class PlayerAccessor(BaseAccessor):
                 raise
             return players
 
-    async def get_player_with_max_votes(
-        self, game_id: int
-    ) -> PlayerModel | None:
-        async with self.app.database.session() as session:
-            try:
-                query = (
-                    select(PlayerModel)
-                    .where(
-                        (PlayerModel.game_id == game_id)
-                        & (PlayerModel.status == PlayerStatus.in_game)
-                    )
-                    .order_by(PlayerModel.votes.desc())
-                )
-                result = await session.execute(query)
-                player = result.scalars().first()
-                if player:
-                    self.logger.info("Player with maximum votes found")
-                else:
-                    self.logger.warning("No players with votes found in game")
-            except SQLAlchemyError:
-                self.logger.error(
-                    "SQLAlchemyError while retrieving player with max votes"
-                )
-                raise
-            except Exception:
-                self.logger.error(
-                    "Unexpected error while retrieving player with max votes"
+    async def get_round_result(self, game_id: int) -> RoundResult:
+        # Counts and the current pair come back as a single aggregated row,
+        # so closing a round doesn't load the voters at all. The pair is
+        # ordered by votes, winner first; a tie keeps the older player first.
+        is_voter = PlayerModel.status.in_(VOTER_STATUSES)
+        in_game = PlayerModel.status == PlayerStatus.in_game
+
+        def pair(column):
+            return array_agg(
+                aggregate_order_by(
+                    column, PlayerModel.votes.desc(), PlayerModel.id
                 )
-                raise
-            return player
+            ).filter(in_game)
 
-    async def get_player_with_min_votes(
-        self, game_id: int
-    ) -> PlayerModel | None:
+        query = select(
+            func.count().filter(is_voter & PlayerModel.is_voted).label("voted"),
+            func.count().filter(is_voter).label("eligible"),
+            pair(PlayerModel.id).label("ids"),
+            pair(PlayerModel.username).label("usernames"),
+            pair(PlayerModel.votes).label("votes"),
+        ).where(PlayerModel.game_id == game_id)
         async with self.app.database.session() as session:
             try:
-                query = (
-                    select(PlayerModel)
-                    .where(
-                        (PlayerModel.game_id == game_id)
-                        & (PlayerModel.status == PlayerStatus.in_game)
-                    )
-                    .order_by(PlayerModel.votes.asc())
-                )
                 result = await session.execute(query)
-                player = result.scalars().first()
-                if player:
-                    self.logger.info("Player with minimum votes found")
-                else:
-                    self.logger.warning("No players with votes found in game")
+                row = result.one()
+                self.logger.info(
+                    "Round result retrieved for game_id=%s", game_id
+                )
             except SQLAlchemyError:
                 self.logger.error(
-                    "SQLAlchemyError while retrieving player with min votes"
+                    "SQLAlchemyError while retrieving round result "
+                    "for game_id=%s",
+                    game_id,
                 )
                 raise
             except Exception:
                 self.logger.error(
-                    "Unexpected error while retrieving player with min votes"
+                    "Unexpected error while retrieving round result "
+                    "for game_id=%s",
+                    game_id,
                 )
                 raise
-            return player
+            pair_players = [
+                RoundPlayer(id=id_, username=username, votes=votes)
+                for id_, username, votes in zip(
+                    row.ids or (),
+                    row.usernames or (),
+                    row.votes or (),
+                    strict=True,
+                )
+            ]
+            return RoundResult(
+                voted=row.voted,
+                eligible=row.eligible,
+                winner=pair_players[0] if pair_players else None,
+                loser=pair_players[1] if len(pair_players) > 1 else None,
+            )
 
     async def get_players_by_status(
         self, game_id: int, status: PlayerStatus
@@ -314,69 +344,80 @@ class PlayerAccessor(BaseAccessor):
                 self.logger.error("Unexpected error while updating round")
                 raise
 
-    async def update_voted(
-        self, game_id: int, player_id: int, new_voted: bool
-    ) -> PlayerModel:
-        async with self.app.database.session() as session:
-            try:
-                query = (
-                    update(PlayerModel)
-                    .values(is_voted=new_voted)
-                    .where(PlayerModel.id == player_id)
-                    .where(PlayerModel.game_id == game_id)
-                    .returning(PlayerModel)
+    async def cast_vote(
+        self, game_id: int, user_id: int, player_id: int
+    ) -> VoteResult:
+        # One statement: the voter is flagged only if still eligible, the
+        # candidate is incremented only if the voter was, and the result
+        # tells whether anybody else is left to vote. Postgres rechecks
+        # `is_voted = false` after a concurrent update, so a double tap
+        # counts once.
+        is_voter = (
+            (PlayerModel.game_id == game_id)
+            & PlayerModel.status.in_(VOTER_STATUSES)
+            & PlayerModel.is_voted.is_(False)
+        )
+        voter = (
+            update(PlayerModel)
+            .where(is_voter & (PlayerModel.user_id == user_id))
+            .where(
+                exists().where(
+                    (PlayerModel.id == player_id)
+                    & (PlayerModel.game_id == game_id)
+                    & (PlayerModel.status == PlayerStatus.in_game)
                 )
-                result = await session.execute(query)
-                await session.commit()
-                self.logger.info(
-                    "Vote status updated successfully for player_id",
-                )
-                return result.scalar_one()
-            except SQLAlchemyError:
-                await session.rollback()
-                self.logger.error(
-                    "SQLAlchemyError while updating vote status for player_id",
-                )
-                raise
-            except Exception:
-                await session.rollback()
-                self.logger.error(
-                    "Unexpected error while updating vote status for player_id",
-                )
-                raise
-
-    async def update_votes_by_username(
-        self, username: str, game_id: int
-    ) -> PlayerModel:
+            )
+            .values(is_voted=True)
+            .returning(PlayerModel.id)
+            .cte("voter")
+        )
+        candidate = (
+            update(PlayerModel)
+            .where(PlayerModel.id == player_id)
+            .where(exists(select(voter.c.id)))
+            .values(votes=PlayerModel.votes + 1)
+            .returning(PlayerModel.votes)
+            .cte("candidate")
+        )
+        # The CTEs' updates aren't visible to this query, so the voter's own
+        # row is excluded explicitly.
+        waiting = exists().where(
+            is_voter & PlayerModel.id.not_in(select(voter.c.id))
+        )
+        query = select(
+            select(voter.c.id).scalar_subquery().label("voter_id"),
+            select(candidate.c.votes).scalar_subquery().label("votes"),
+            (~waiting).label("all_voted"),
+        )
         async with self.app.database.session() as session:
             try:
-                query = (
-                    update(PlayerModel)
-                    .values(votes=PlayerModel.votes + 1)
-                    .where(PlayerModel.username == username)
-                    .where(PlayerModel.game_id == game_id)
-                    .returning(PlayerModel)
-                )
                 result = await session.execute(query)
+                row = result.one()
                 await session.commit()
                 self.logger.info(
-                    "Votes updated successfully for username=%s", username
+                    "Vote cast for player_id=%s in game_id=%s",
+                    player_id,
+                    game_id,
                 )
-                return result.scalar_one()
             except SQLAlchemyError:
                 await session.rollback()
                 self.logger.error(
-                    "SQLAlchemyError while updating votes for username=%s",
-                    username,
+                    "SQLAlchemyError while casting vote in game_id=%s",
+                    game_id,
                 )
                 raise
             except Exception:
                 await session.rollback()
                 self.logger.error(
-                    "Unexpected error while updating votes for username=%s",
-                    username,
+                    "Unexpected error while casting vote in game_id=%s",
+                    game_id,
                 )
                 raise
+            return VoteResult(
+                accepted=row.voter_id is not None,
+                votes=row.votes,
+                all_voted=row.all_voted,
+            )
 
     async def set_players_in_game(
         self, game_id: int, player_ids: list[int]
@@ -442,55 +483,6 @@ class PlayerAccessor(BaseAccessor):
                 )
                 raise
 
-    async def check_all_votes_true_for_game(self, game_id: int) -> bool:
-        async with self.app.database.session() as session:
-            try:
-                query = (
-                    select(PlayerModel)
-                    .join(PlayerModel.game)
-                    .where(PlayerModel.game_id == game_id)
-                    .where(
-                        or_(
-                            PlayerModel.status == PlayerStatus.voting,
-                            PlayerModel.status == PlayerStatus.loser,
-                        )
-                    )
-                    .where(PlayerModel.is_voted)
-                )
-                result = await session.execute(query)
-                players = result.scalars().all()
-
-                query_total_players = (
-                    select(PlayerModel)
-                    .where(PlayerModel.game_id == game_id)
-                    .where(
-                        or_(
-                            PlayerModel.status == PlayerStatus.voting,
-                            PlayerModel.status == PlayerStatus.loser,
-                        )
-                    )
-                )
-                total_players_result = await session.execute(
-                    query_total_players
-                )
-                total_players = total_players_result.scalars().all()
-
-                all_voted = len(players) == len(total_players)
-                self.logger.info("All players voted: %s", all_voted)
-            except SQLAlchemyError:
-                self.logger.error(
-                    "SQLAlchemyError while checking votes for game_id=%s",
-                    game_id,
-                )
-                raise
-            except Exception:
-                self.logger.error(
-                    "Unexpected error while checking votes for game_id=%s",
-                    game_id,
-                )
-                raise
-            return all_voted
-
     async def reset_votes_for_players_in_game(self, game_id: int):
         async with self.app.database.session() as session:
             try:
@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class VoteResult:
+    accepted: bool
+    votes: int | None
+    all_voted: bool
+
+
+@dataclass
+class RoundPlayer:
+    id: int
+    username: str
+    votes: int
+
+
+@dataclass
+class RoundResult:
+    voted: int
+    eligible: int
+    winner: RoundPlayer | None
+    loser: RoundPlayer | None
+
+    @property
+    def all_voted(self) -> bool:
+        return self.voted == self.eligible
+
+    @property
+    def is_tie(self) -> bool:
+        return self.winner.votes == self.loser.votes
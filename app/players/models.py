@@ -1,7 +1,7 @@
 import typing
 from enum import StrEnum, auto
 
-from sqlalchemy import Boolean, ForeignKey
+from sqlalchemy import Boolean, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.database.base import BaseModel, created_at
@@ -19,6 +19,19 @@ class PlayerStatus(StrEnum):
 
 class PlayerModel(BaseModel):
     __tablename__ = "players"
+    __table_args__ = (
+        Index("ix_players_game_id_status", "game_id", "status"),
+        Index("ix_players_game_id_user_id", "game_id", "user_id"),
+        Index("ix_players_game_id_username", "game_id", "username"),
+        # Players who still have to vote in the current round.
+        Index(
+            "ix_players_game_id_waiting",
+            "game_id",
+            postgresql_where=text(
+                "NOT is_voted AND status IN ('voting', 'loser')"
+            ),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
@@ -9,8 +9,10 @@ from app.database.database import Database
 class Store:
     def __init__(self, app: "Application", *args, **kwargs):
         from app.admin.accessor import AdminAccessor
+        from app.avatars.accessor import AvatarPhotoAccessor
         from app.bot.manager import BotManager
         from app.chats.accessor import ChatAccessor
+        from app.checkpoints.accessor import CheckpointAccessor
         from app.games.accessor import GameAccessor
         from app.players.accessor import PlayerAccessor
         from app.vk_api.accessor import VkApiAccessor
@@ -22,6 +24,8 @@ class Store:
         self.chats = ChatAccessor(app)
         self.players = PlayerAccessor(app)
         self.games = GameAccessor(app)
+        self.avatars = AvatarPhotoAccessor(app)
+        self.checkpoints = CheckpointAccessor(app)
 
 
 def setup_store(app: "Application"):
@@ -1,29 +1,58 @@
-import json
+import asyncio
 import random
 import typing
-from urllib.parse import urlencode, urljoin
+from collections.abc import AsyncIterator
 
-from aiohttp import FormData, TCPConnector
+from aiohttp import ClientError, FormData
 from aiohttp.client import ClientSession
 
+from app.base import codec
 from app.base.base_accessor import BaseAccessor
+from app.web.config import UpdatesMode
 
-from .dataclasses import Event, Message, Photo, UploadPhoto
-from .errors import VkApiError
-from .poller import Poller
+from .batcher import (
+    EXECUTE_METHOD,
+    MAX_EXECUTE_CALLS,
+    build_execute_code,
+    split_execute_response,
+)
+from .dataclasses import (
+    Event,
+    Message,
+    Photo,
+    Profile,
+    ProfileList,
+    Update,
+    UploadPhoto,
+)
+from .decoder import decode_updates
+from .errors import CHAT_PERMISSION_ERRORS, PhotoTooLargeError, VkApiError
+from .photo_pipeline import PhotoPipeline
+from .poller import LongPollFailure, LongPollStats, Poller, UpdateQueue
+from .retry import CircuitBreaker, RetryPolicy
+from .roster import RosterCache
+from .scheduler import OutboundScheduler
 from .schemas import (
     PhotoSchema,
     ProfileListSchema,
     ProfileSchema,
-    UpdateSchema,
     UploadPhotoSchema,
 )
+from .transport import VkTransport
 
 if typing.TYPE_CHECKING:
     from app.web.app import Application
 
-API_PATH = "https://api.vk.com/method/"
-API_VERSION = "5.131"
+PHOTO_CHUNK_SIZE = 64 * 1024
+UPLOAD_ENDPOINT = "photo_upload"
+DOWNLOAD_ENDPOINT = "photo_download"
+LONG_POLL_BASE_BACKOFF = 1
+EMPTY_KEYBOARD = "{}"
+MEMBERS_PAGE_SIZE = 200
+MEMBER_FIELDS = "screen_name,photo_100"
+
+profile_list_schema = ProfileListSchema()
+profile_schema = ProfileSchema()
 
 
 class VkApiAccessor(BaseAccessor):
@@ -34,141 +63,288 @@ class VkApiAccessor(BaseAccessor):
         self.key: str | None = None
         self.server: str | None = None
         self.poller: Poller | None = None
+        self.update_queue: UpdateQueue | None = None
         self.ts: int | None = None
+        self.long_poll_stats = LongPollStats()
         self.album_id: int | None = None
         self.upload_server: str | None = None
+        self.transport = VkTransport(
+            token=app.config.bot.token,
+            api_path=app.config.bot.api_path,
+            api_timeout=app.config.bot.api_timeout,
+            connect_timeout=app.config.bot.connect_timeout,
+            long_poll_wait=app.config.bot.long_poll_wait,
+            pool_limit=app.config.bot.pool_limit,
+            pool_limit_per_host=app.config.bot.pool_limit_per_host,
+            dns_cache_ttl=app.config.bot.dns_cache_ttl,
+            keepalive_timeout=app.config.bot.keepalive_timeout,
+        )
+        self.scheduler = OutboundScheduler(
+            self._send_api_request,
+            rate=app.config.bot.api_rate_limit,
+            send_batch=self._send_execute,
+            batch_size=min(
+                app.config.bot.api_execute_batch_size, MAX_EXECUTE_CALLS
+            ),
+        )
+        self.retry = RetryPolicy(
+            max_retries=app.config.bot.api_max_retries,
+            base_delay=app.config.bot.api_retry_base_delay,
+            max_delay=app.config.bot.api_retry_max_delay,
+            breaker=CircuitBreaker(
+                failure_threshold=app.config.bot.circuit_failure_threshold,
+                reset_timeout=app.config.bot.circuit_reset_timeout,
+            ),
+        )
+        self.roster = RosterCache(
+            self,
+            maxsize=app.config.bot.roster_cache_size,
+            ttl=app.config.bot.roster_cache_ttl,
+        )
+        self.photo_pipeline = PhotoPipeline(
+            self,
+            concurrency=app.config.bot.photo_upload_concurrency,
+            cache_ttl=app.config.bot.avatar_cache_ttl,
+        )
 
     async def connect(self, app: "Application") -> None:
-        self.session = ClientSession(connector=TCPConnector(verify_ssl=False))
+        self.session = self.transport.connect()
 
+        long_poll = app.config.bot.updates_mode == UpdatesMode.long_poll
         try:
-            await self._get_long_poll_service()
+            if long_poll:
+                await self._resume_long_poll()
             await self._get_messages_upload_service()
+        except ValueError:
+            # A missing setting, not a VK failure: don't start polling.
+            raise
         except Exception:
             self.logger.error("Exception")
 
-        self.poller = Poller(app.store)
+        self.update_queue = UpdateQueue(
+            app.store,
+            maxsize=app.config.bot.update_queue_size,
+            workers=app.config.bot.update_workers,
+        )
+        self.update_queue.start()
+        if not long_poll:
+            self.logger.info("receive updates through Callback API")
+            return
+
+        self.poller = Poller(app.store, self.update_queue)
         self.logger.info("start polling")
         self.poller.start()
 
     async def disconnect(self, app: "Application") -> None:
-        if self.session:
-            await self.session.close()
-
         if self.poller:
             await self.poller.stop()
 
-    @staticmethod
-    def _build_query(host: str, method: str, params: dict) -> str:
-        params.setdefault("v", API_VERSION)
-        return f"{urljoin(host, method)}?{urlencode(params)}"
-
-    async def _get_long_poll_service(self) -> None:
-        async with self.session.get(
-            self._build_query(
-                host=API_PATH,
-                method="groups.getLongPollServer",
-                params={
-                    "group_id": self.app.config.bot.group_id,
-                    "access_token": self.app.config.bot.token,
-                },
-            )
-        ) as response:
-            data = (await response.json())["response"]
-            self.key = data["key"]
-            self.server = data["server"]
+        if self.update_queue:
+            await self.update_queue.stop()
+
+        await self.scheduler.stop()
+
+        await self.transport.close()
+        self.session = None
+
+    async def _resume_long_poll(self) -> None:
+        group_id = self.app.config.bot.group_id
+        # Checkpoints are keyed by the group, so polling without one would
+        # resume from another bot's position.
+        if group_id is None:
+            msg = "GROUP_ID is not set"
+            raise ValueError(msg)
+        checkpoint = await self.app.store.checkpoints.get_ts(group_id)
+        self.ts = checkpoint
+        server_ts = await self._get_long_poll_service()
+        if checkpoint is None:
+            return
+        behind = max(int(server_ts) - checkpoint, 0)
+        self.long_poll_stats.replayed += behind
+        self.logger.info(
+            "Resume long poll from ts %s, %s updates behind", checkpoint, behind
+        )
+
+    async def _get_long_poll_service(self) -> str:
+        data = await self.transport.call_api(
+            "groups.getLongPollServer",
+            {"group_id": self.app.config.bot.group_id},
+        )
+        data = data["response"]
+        self.key = data["key"]
+        self.server = data["server"]
+        if self.ts is None:
             self.ts = data["ts"]
+        return data["ts"]
 
     async def _get_messages_upload_service(self) -> None:
-        async with self.session.get(
-            self._build_query(
-                host=API_PATH,
-                method="photos.getMessagesUploadServer",
-                params={
-                    "group_id": self.app.config.bot.group_id,
-                    "access_token": self.app.config.bot.token,
-                },
-            )
-        ) as response:
-            data = (await response.json())["response"]
-            self.album_id = data["album_id"]
-            self.upload_server = data["upload_url"]
+        data = await self.transport.call_api(
+            "photos.getMessagesUploadServer",
+            {"group_id": self.app.config.bot.group_id},
+        )
+        data = data["response"]
+        self.album_id = data["album_id"]
+        self.upload_server = data["upload_url"]
 
     async def _api_request(self, method: str, params: dict) -> dict:
-        url = self._build_query(API_PATH, method, params)
+        peer_id = params.get("peer_id")
         try:
-            async with self.session.get(url) as response:
-                data = await response.json()
-                if "error" in data:
-                    self.logger.error(data)
-                    raise VkApiError(data)
-                if "warning" in data:
-                    self.logger.warning(data)
-                return data
-        except VkApiError:
+            return await self.retry.call(
+                method,
+                lambda: self.scheduler.submit(method, params, peer_id=peer_id),
+            )
+        except VkApiError as e:
+            # A cached roster stands in for the members call that checks
+            # the bot's rights, so it must go once they are gone.
+            if peer_id is not None and e.error_code in CHAT_PERMISSION_ERRORS:
+                self.roster.invalidate(peer_id)
             raise
+
+    async def _send_execute(
+        self, calls: list[tuple[str, dict]]
+    ) -> list[dict | VkApiError]:
+        data = await self._send_api_request(
+            EXECUTE_METHOD, {"code": build_execute_code(calls)}
+        )
+        return split_execute_response(data, len(calls))
+
+    async def _send_api_request(self, method: str, params: dict) -> dict:
+        try:
+            data = await self.transport.call_api(method, params)
         except Exception:
             self.logger.error("Unknown error during request to VK API")
             raise
-
-    async def poll(self):
-        async with self.session.get(
-            self._build_query(
-                host=self.server,
-                method="",
-                params={
-                    "act": "a_check",
-                    "key": self.key,
-                    "ts": self.ts,
-                    "wait": 30,
-                },
-            )
-        ) as response:
-            data = await response.json()
-
+        if "error" in data:
+            self.logger.error(data)
+            raise VkApiError(data)
+        if "warning" in data:
+            self.logger.warning(data)
+        return data
+
+    async def poll(self) -> list[Update]:
+        failures = 0
+        while True:
             try:
-                self.ts = data["ts"]
-                self.logger.info(data)
-            except KeyError:
-                await self._get_long_poll_service()
-                await self.poll()
-
-            updates = [
-                UpdateSchema().load(update)
-                for update in data.get(
-                    "updates",
-                    [],
+                if self.key is None:
+                    await self._get_long_poll_service()
+                data = await self.transport.long_poll(
+                    self.server, self.key, self.ts
+                )
+            except (ClientError, TimeoutError, KeyError) as e:
+                failures += 1
+                self.long_poll_stats.network_errors += 1
+                delay = self._long_poll_backoff(failures)
+                self.logger.warning(
+                    "Long poll request failed: %r, retry in %s s", e, delay
                 )
-            ]
+                await asyncio.sleep(delay)
+                continue
 
-            if updates:
-                await self.app.store.bots_manager.handle_updates(updates)
+            if "failed" not in data:
+                self.ts = data["ts"]
+                self.logger.info(data)
+                return decode_updates(data.get("updates", []))
+
+            self.logger.warning("Long poll failed: %s", data)
+            match data["failed"]:
+                case LongPollFailure.history_outdated:
+                    self.long_poll_stats.outdated_ts += 1
+                    skipped = max(int(data["ts"]) - int(self.ts), 0)
+                    self.long_poll_stats.skipped += skipped
+                    self.logger.warning(
+                        "Long poll history outdated, %s updates skipped",
+                        skipped,
+                    )
+                    self.ts = data["ts"]
+                    continue
+                case LongPollFailure.key_expired:
+                    self.long_poll_stats.expired_keys += 1
+                    self.key = None
+                case LongPollFailure.information_lost:
+                    self.long_poll_stats.lost_sessions += 1
+                    self.key = None
+                    self.ts = None
+                case _:
+                    self.logger.warning(
+                        "Unknown long poll failure %s, keeping the session",
+                        data["failed"],
+                    )
+            # A handshake that keeps failing must not spin.
+            failures += 1
+            await asyncio.sleep(self._long_poll_backoff(failures))
+
+    def _long_poll_backoff(self, failures: int) -> float:
+        return min(
+            self.app.config.bot.long_poll_max_backoff,
+            LONG_POLL_BASE_BACKOFF * 2 ** (failures - 1),
+        )
 
-    async def get_chat_members(self, peer_id: int) -> list[ProfileSchema]:
-        params = {
-            "peer_id": peer_id,
-            "access_token": self.app.config.bot.token,
-        }
+    async def iter_chat_members(
+        self, peer_id: int, page_size: int = MEMBERS_PAGE_SIZE
+    ) -> AsyncIterator[list[Profile]]:
+        offset = 0
+        while True:
+            params = {
+                "peer_id": peer_id,
+                "fields": MEMBER_FIELDS,
+                "count": page_size,
+                "offset": offset,
+            }
+            try:
+                data = await self._api_request(
+                    "messages.getConversationMembers", params
+                )
+                page = profile_list_schema.load(data)
+            except Exception:
+                self.logger.error("Error during get members of chat")
+                raise
+
+            yield page.profiles
+
+            items = data["response"].get("items", [])
+            offset += len(items)
+            if not items or offset >= data["response"].get("count", 0):
+                self.logger.info("Members of chat successfully get")
+                return
+
+    async def get_chat_members(self, peer_id: int) -> ProfileList:
+        profiles = []
+        async for page in self.iter_chat_members(peer_id):
+            profiles.extend(page)
+        return ProfileList(profiles=profiles)
+
+    async def get_user_profile(self, user_id: int) -> Profile:
+        params = {"user_ids": user_id, "fields": MEMBER_FIELDS}
         try:
-            data = await self._api_request(
-                "messages.getConversationMembers", params
-            )
-            profiles = ProfileListSchema().load(data)
-            self.logger.info("Members of chat successfully get")
+            data = await self._api_request("users.get", params)
+            return profile_schema.load(data["response"][0])
         except Exception:
-            self.logger.error("Error during get members of chat")
-        return profiles
+            self.logger.error("Error during get user profile")
+            raise
+
+    async def upload_photo(self, image_url, hasher=None) -> UploadPhoto:
+        if self.app.config.bot.stream_photo_uploads:
+            return await self.upload_image(
+                self.stream_file(image_url, hasher=hasher)
+            )
 
-    async def upload_photo(self, image_url) -> UploadPhoto:
         image_file = await self.upload_file(image_url)
+        if hasher is not None:
+            hasher.update(image_file)
+        return await self.upload_image(image_file)
+
+    async def upload_image(
+        self, image_file: bytes | AsyncIterator[bytes]
+    ) -> UploadPhoto:
         form = FormData()
         form.add_field(
             "photo", image_file, filename="photo.jpg", content_type="image/jpeg"
         )
         try:
-            async with self.session.post(
-                self.upload_server, data=form
-            ) as response:
+            async with (
+                self.transport.measure(UPLOAD_ENDPOINT),
+                self.session.post(self.upload_server, data=form) as response,
+            ):
                 data = await response.json()
                 if "error" in data:
                     self.logger.error("Error during upload photo")
@@ -180,13 +356,39 @@ class VkApiAccessor(BaseAccessor):
             self.logger.error("Error during upload photo")
             raise
 
-    async def upload_file(self, image_url):
-        async with self.session.get(image_url) as response:
-            return await response.read()
+    async def upload_file(self, image_url) -> bytes:
+        async with (
+            self.transport.measure(DOWNLOAD_ENDPOINT),
+            self.session.get(image_url) as response,
+        ):
+            self._check_photo_size(response.content_length)
+            image_file = await response.read()
+            self._check_photo_size(len(image_file))
+            return image_file
+
+    async def stream_file(
+        self, image_url: str, hasher=None
+    ) -> AsyncIterator[bytes]:
+        async with (
+            self.transport.measure(DOWNLOAD_ENDPOINT),
+            self.session.get(image_url) as response,
+        ):
+            self._check_photo_size(response.content_length)
+            size = 0
+            async for chunk in response.content.iter_chunked(PHOTO_CHUNK_SIZE):
+                size += len(chunk)
+                self._check_photo_size(size)
+                if hasher is not None:
+                    hasher.update(chunk)
+                yield chunk
+
+    def _check_photo_size(self, size: int | None) -> None:
+        if size is not None and size > self.app.config.bot.max_photo_size:
+            self.logger.error("Photo exceeds %s bytes", size)
+            raise PhotoTooLargeError(size)
 
     async def save_photo(self, upload_photo: UploadPhoto) -> Photo:
         params = {
-            "access_token": self.app.config.bot.token,
             "photo": upload_photo.photo,
             "server": upload_photo.server,
             "hash": upload_photo.hash,
@@ -210,17 +412,18 @@ class VkApiAccessor(BaseAccessor):
         self,
         message: Message,
         peer_id: int,
-        keyboard: dict | None = None,
+        keyboard: dict | str | None = None,
     ) -> None:
         if keyboard is None:
-            keyboard = {}
-
-        json_keyboard = json.dumps(keyboard, ensure_ascii=False)
+            json_keyboard = EMPTY_KEYBOARD
+        elif isinstance(keyboard, str):
+            json_keyboard = keyboard
+        else:
+            json_keyboard = codec.dumps(keyboard)
         params = {
             "random_id": random.randint(1, 2**32),
             "peer_id": peer_id,
             "message": message.text,
-            "access_token": self.app.config.bot.token,
             "keyboard": json_keyboard,
         }
         try:
@@ -232,7 +435,6 @@ class VkApiAccessor(BaseAccessor):
 
     async def send_photo(self, photo: Photo, peer_id: int) -> None:
         params = {
-            "access_token": self.app.config.bot.token,
             "attachment": f"photo{photo.owner_id}_{photo.id}",
             "peer_id": peer_id,
             "message": "",
@@ -257,7 +459,6 @@ class VkApiAccessor(BaseAccessor):
         )
 
         params = {
-            "access_token": self.app.config.bot.token,
             "attachment": photos,
             "peer_id": peer_id,
             "message": "",
@@ -276,7 +477,6 @@ class VkApiAccessor(BaseAccessor):
 
     async def send_event_answer(self, event_obj: Event):
         params = {
-            "access_token": self.app.config.bot.token,
             "event_id": event_obj.event_id,
             "user_id": event_obj.from_id,
             "peer_id": event_obj.peer_id,
@@ -0,0 +1,37 @@
+from app.base import codec
+
+from .errors import VkApiError
+
+EXECUTE_METHOD = "execute"
+MAX_EXECUTE_CALLS = 25
+EXECUTE_SKIP_PARAMS = frozenset({"access_token", "v"})
+
+
+def build_execute_code(calls: list[tuple[str, dict]]) -> str:
+    api_calls = ",".join(
+        f"API.{method}({_encode_params(params)})" for method, params in calls
+    )
+    return f"return [{api_calls}];"
+
+
+def split_execute_response(data: dict, count: int) -> list[dict | VkApiError]:
+    results = data.get("response") or [False] * count
+    errors = iter(data.get("execute_errors", []))
+    split = []
+    for result in results:
+        if result is False:
+            error = next(errors, {"error_msg": "execute call failed"})
+            split.append(VkApiError({"error": error}))
+        else:
+            split.append({"response": result})
+    return split
+
+
+def _encode_params(params: dict) -> str:
+    return codec.dumps(
+        {
+            key: value
+            for key, value in params.items()
+            if key not in EXECUTE_SKIP_PARAMS
+        }
+    )
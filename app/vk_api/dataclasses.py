@@ -10,6 +10,7 @@ class Message:
 @dataclass
 class Payload:
     button: str
+    player_id: int | None = None
 
 
 @dataclass
@@ -0,0 +1,82 @@
+from collections.abc import Callable
+from typing import Any
+
+from .dataclasses import Action, Payload, Update, UpdateMessage, UpdateObject
+from .schemas import UpdateSchema
+
+__all__ = ("decode_update", "decode_updates")
+
+update_schema = UpdateSchema()
+
+
+def _int(value: Any) -> int:
+    if type(value) is not int:
+        raise TypeError(value)
+    return value
+
+
+def _str(value: Any) -> str:
+    if type(value) is not str:
+        raise TypeError(value)
+    return value
+
+
+def _decode_action(data: dict) -> Action:
+    action = Action(type=_str(data["type"]))
+    if "member_id" in data and data["member_id"] is not None:
+        action.member_id = _int(data["member_id"])
+    return action
+
+
+def _decode_message(data: dict) -> UpdateMessage:
+    message = UpdateMessage(
+        from_id=_int(data["from_id"]),
+        text=_str(data["text"]),
+        id=_int(data["id"]),
+        peer_id=_int(data["peer_id"]),
+    )
+    if "action" in data:
+        message.action = _decode_action(data["action"])
+    return message
+
+
+def _decode_payload(data: dict) -> Payload:
+    payload = Payload(button=_str(data["button"]))
+    if "player_id" in data:
+        payload.player_id = _int(data["player_id"])
+    return payload
+
+
+OBJECT_FIELDS: dict[str, Callable[[Any], Any]] = {
+    "message": _decode_message,
+    "event_id": _str,
+    "user_id": _int,
+    "peer_id": _int,
+    "payload": _decode_payload,
+}
+
+
+def decode_update(data: dict) -> Update:
+    # Plain VK payloads take the fast path. Anything it doesn't expect
+    # (string numbers, nulls, missing keys) goes through the marshmallow
+    # schema, so coercion and errors stay exactly the same.
+    try:
+        obj = data["object"]
+        if type(obj) is not dict:
+            raise TypeError(obj)
+        return Update(
+            type=_str(data["type"]),
+            object=UpdateObject(
+                **{
+                    key: decode(obj[key])
+                    for key, decode in OBJECT_FIELDS.items()
+                    if key in obj
+                }
+            ),
+        )
+    except (KeyError, TypeError, AttributeError):
+        return update_schema.load(data)
+
+
+def decode_updates(updates: list[dict]) -> list[Update]:
+    return [decode_update(update) for update in updates]
@@ -1,3 +1,22 @@
+UNKNOWN_ERROR = 1
+TOO_MANY_REQUESTS = 6
+PERMISSION_DENIED = 7
+INTERNAL_SERVER_ERROR = 10
+ACCESS_DENIED = 15
+INVALID_PARAMETER = 100
+ALBUM_ACCESS_DENIED = 200
+CHAT_ACCESS_DENIED = 917
+# Codes messages.send returns for an attachment that no longer exists or
+# the bot can't access.
+REJECTED_ATTACHMENT_ERRORS = frozenset(
+    {ACCESS_DENIED, INVALID_PARAMETER, ALBUM_ACCESS_DENIED}
+)
+# Codes a chat call returns once the bot has lost its rights there.
+CHAT_PERMISSION_ERRORS = frozenset(
+    {PERMISSION_DENIED, ACCESS_DENIED, CHAT_ACCESS_DENIED}
+)
+
+
 class VkApiError(Exception):
     def __init__(self, error_data):
         self.error_code = error_data.get("error", {}).get(
@@ -10,3 +29,22 @@ class VkApiError(Exception):
         super().__init__(
             f"Ошибка VK API: {self.error_msg} (код: {self.error_code})"
         )
+
+
+class PhotoTooLargeError(Exception):
+    def __init__(self, size: int):
+        self.size = size
+        super().__init__(f"Фотография слишком большая: {size} байт")
+
+
+class SchedulerStoppedError(Exception):
+    def __init__(self):
+        super().__init__("Отправка в VK API остановлена")
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            f"VK API временно недоступен, повтор через {retry_after:.1f} с"
+        )
@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import hashlib
+import time
+import typing
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from app.base.clock import utc_now
+
+from .dataclasses import Photo
+from .errors import REJECTED_ATTACHMENT_ERRORS, VkApiError
+
+if typing.TYPE_CHECKING:
+    from app.avatars.accessor import AvatarPhotoAccessor
+    from app.avatars.models import AvatarPhotoModel
+
+    from .accessor import VkApiAccessor
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    total: float = 0.0
+    last: float = 0.0
+    max: float = 0.0
+
+    @property
+    def avg(self) -> float:
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        self.max = max(self.max, duration)
+
+
+@dataclass
+class PhotoPipelineStats:
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_revalidations: int = 0
+    cache_rejections: int = 0
+
+    def stage(self, name: str) -> StageStats:
+        return self.stages.setdefault(name, StageStats())
+
+
+class PhotoPipeline:
+    def __init__(
+        self, vk_api: "VkApiAccessor", concurrency: int, cache_ttl: int
+    ) -> None:
+        self.vk_api = vk_api
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.cache_ttl = datetime.timedelta(seconds=cache_ttl)
+        self.stats = PhotoPipelineStats()
+
+    @property
+    def avatars(self) -> "AvatarPhotoAccessor":
+        return self.vk_api.app.store.avatars
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.stats.stage(stage).add(time.monotonic() - started_at)
+
+    async def send_photos(self, image_urls: list[str], peer_id: int) -> None:
+        prepared = await self._prepare_photos(image_urls, use_cache=True)
+        try:
+            await self.vk_api.send_photos(
+                [photo for photo, _ in prepared], peer_id=peer_id
+            )
+        except VkApiError as e:
+            # Throttling and server errors say nothing about the cached
+            # photos, re-uploading them would only add load.
+            if e.error_code not in REJECTED_ATTACHMENT_ERRORS or not any(
+                from_cache for _, from_cache in prepared
+            ):
+                raise
+            self.stats.cache_rejections += 1
+            self.vk_api.logger.warning(
+                "VK rejected cached avatar photos, uploading them again"
+            )
+            for image_url, (_, from_cache) in zip(
+                image_urls, prepared, strict=True
+            ):
+                if from_cache:
+                    self.avatars.invalidate(image_url)
+            photos = await self.prepare_photos(image_urls, use_cache=False)
+            await self.vk_api.send_photos(photos, peer_id=peer_id)
+
+    async def prepare_photos(
+        self, image_urls: list[str], use_cache: bool = True
+    ) -> list[Photo]:
+        prepared = await self._prepare_photos(image_urls, use_cache=use_cache)
+        return [photo for photo, _ in prepared]
+
+    async def _prepare_photos(
+        self, image_urls: list[str], use_cache: bool
+    ) -> list[tuple[Photo, bool]]:
+        with self.measure("total"):
+            try:
+                async with asyncio.TaskGroup() as group:
+                    tasks = [
+                        group.create_task(
+                            self.prepare_photo(image_url, use_cache=use_cache)
+                        )
+                        for image_url in image_urls
+                    ]
+            except ExceptionGroup as e:
+                raise e.exceptions[0] from e
+        return [task.result() for task in tasks]
+
+    async def prepare_photo(
+        self, image_url: str, use_cache: bool = True
+    ) -> tuple[Photo, bool]:
+        cached = None
+        if use_cache:
+            cached = await self.avatars.get_by_avatar_url(image_url)
+        if cached and utc_now() - cached.checked_at < self.cache_ttl:
+            self.stats.cache_hits += 1
+            return self._cached_photo(cached), True
+
+        async with self.semaphore:
+            if cached:
+                with self.measure("download"):
+                    content_hash = await self._get_content_hash(image_url)
+                if cached.content_hash == content_hash:
+                    self.stats.cache_revalidations += 1
+                    await self.avatars.mark_checked(image_url)
+                    return self._cached_photo(cached), True
+
+            self.stats.cache_misses += 1
+            hasher = hashlib.sha256()
+            with self.measure("transfer"):
+                upload_photo = await self.vk_api.upload_photo(
+                    image_url, hasher=hasher
+                )
+            content_hash = hasher.hexdigest()
+            with self.measure("save"):
+                photo = await self.vk_api.save_photo(upload_photo)
+
+        await self.avatars.save_photo(
+            avatar_url=image_url,
+            content_hash=content_hash,
+            photo=photo,
+        )
+        return photo, False
+
+    async def _get_content_hash(self, image_url: str) -> str:
+        hasher = hashlib.sha256()
+        async for chunk in self.vk_api.stream_file(image_url):
+            hasher.update(chunk)
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _cached_photo(avatar_photo: "AvatarPhotoModel") -> Photo:
+        return Photo(
+            album_id=avatar_photo.album_id,
+            id=avatar_photo.photo_id,
+            owner_id=avatar_photo.owner_id,
+        )
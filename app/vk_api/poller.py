@@ -1,12 +1,186 @@
 import asyncio
+import time
 from asyncio import Future, Task
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from enum import IntEnum
 
 from app.store import Store
 
+from .dataclasses import Update
+
+
+@dataclass
+class QueuedUpdate:
+    update: Update
+    enqueued_at: float
+    ts: int | None = None
+
+
+class LongPollFailure(IntEnum):
+    history_outdated = 1
+    key_expired = 2
+    information_lost = 3
+
+
+@dataclass
+class LongPollStats:
+    outdated_ts: int = 0
+    expired_keys: int = 0
+    lost_sessions: int = 0
+    network_errors: int = 0
+    replayed: int = 0
+    skipped: int = 0
+
+
+@dataclass
+class UpdateQueueStats:
+    enqueued: int = 0
+    handled: int = 0
+    failed: int = 0
+    backpressure_waits: int = 0
+    last_lag: float = 0.0
+    max_lag: float = 0.0
+    total_lag: float = 0.0
+
+    @property
+    def avg_lag(self) -> float:
+        if not self.handled:
+            return 0.0
+        return self.total_lag / self.handled
+
+
+class CheckpointTracker:
+    def __init__(self) -> None:
+        self.pending: OrderedDict[int, int] = OrderedDict()
+        self.watermark: int | None = None
+
+    def add(self, ts: int, count: int) -> int | None:
+        self.pending[ts] = self.pending.get(ts, 0) + count
+        return self._advance()
+
+    def done(self, ts: int) -> int | None:
+        self.pending[ts] -= 1
+        return self._advance()
+
+    def _advance(self) -> int | None:
+        advanced = None
+        while self.pending:
+            ts, count = next(iter(self.pending.items()))
+            if count:
+                break
+            self.pending.popitem(last=False)
+            advanced = ts
+        if advanced is None or advanced == self.watermark:
+            return None
+        self.watermark = advanced
+        return advanced
+
+
+class UpdateQueue:
+    def __init__(self, store: Store, maxsize: int, workers: int) -> None:
+        self.store = store
+        self.workers = workers
+        self.queue: asyncio.Queue[QueuedUpdate] = asyncio.Queue()
+        # Bounds the updates waiting either in the queue or in a backlog.
+        self.slots = asyncio.Semaphore(maxsize)
+        # Updates by chat_id, the first one is being handled.
+        self.backlogs: dict[int, deque[QueuedUpdate]] = {}
+        self.stats = UpdateQueueStats()
+        self.checkpoint = CheckpointTracker()
+        self.consumer_tasks: list[Task] = []
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize() + sum(
+            len(backlog) - 1 for backlog in self.backlogs.values()
+        )
+
+    async def put(self, update: Update, ts: int | None = None) -> None:
+        if self.slots.locked():
+            self.stats.backpressure_waits += 1
+            self.store.app.logger.warning(
+                "update queue is full, long polling is waiting for handlers"
+            )
+        await self.slots.acquire()
+        self.queue.put_nowait(
+            QueuedUpdate(update=update, enqueued_at=time.monotonic(), ts=ts)
+        )
+        self.stats.enqueued += 1
+
+    async def put_batch(self, updates: list[Update], ts: int) -> None:
+        await self._save_checkpoint(self.checkpoint.add(ts, len(updates)))
+        for update in updates:
+            await self.put(update, ts=ts)
+
+    async def _save_checkpoint(self, ts: int | None) -> None:
+        if ts is None:
+            return
+        try:
+            await self.store.checkpoints.save_ts(
+                self.store.app.config.bot.group_id, ts
+            )
+        except Exception:
+            self.store.app.logger.exception("long poll checkpoint not saved")
+
+    def start(self) -> None:
+        self.consumer_tasks = [
+            asyncio.create_task(self.consume()) for _ in range(self.workers)
+        ]
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except TimeoutError:
+            self.store.app.logger.warning(
+                "update queue stopped with %s unhandled updates", self.depth
+            )
+
+        for task in self.consumer_tasks:
+            task.cancel()
+        await asyncio.gather(*self.consumer_tasks, return_exceptions=True)
+        self.consumer_tasks = []
+
+    async def consume(self) -> None:
+        while True:
+            item = await self.queue.get()
+            chat_id = self.store.bots_manager.get_chat_id(item.update)
+            if chat_id in self.backlogs:
+                # The consumer that owns the chat takes it next, so a busy
+                # chat never holds up the others.
+                self.backlogs[chat_id].append(item)
+                continue
+
+            backlog = self.backlogs[chat_id] = deque([item])
+            try:
+                while backlog:
+                    await self._handle(backlog[0])
+                    backlog.popleft()
+            finally:
+                del self.backlogs[chat_id]
+
+    async def _handle(self, item: QueuedUpdate) -> None:
+        self.slots.release()
+        lag = time.monotonic() - item.enqueued_at
+        self.stats.last_lag = lag
+        self.stats.max_lag = max(self.stats.max_lag, lag)
+        self.stats.total_lag += lag
+        try:
+            await self.store.bots_manager.handle_update(item.update)
+        except Exception:
+            self.stats.failed += 1
+            self.store.app.logger.exception("update handling failed")
+        finally:
+            self.stats.handled += 1
+            if item.ts is not None:
+                await self._save_checkpoint(self.checkpoint.done(item.ts))
+            self.queue.task_done()
+
 
 class Poller:
-    def __init__(self, store: Store) -> None:
+    def __init__(self, store: Store, queue: UpdateQueue) -> None:
         self.store = store
+        self.queue = queue
         self.is_running = False
         self.poll_task: Task | None = None
 
@@ -31,4 +205,5 @@ class Poller:
 
     async def poll(self) -> None:
         while self.is_running:
-            await self.store.vk_api.poll()
+            updates = await self.store.vk_api.poll()
+            await self.queue.put_batch(updates, int(self.store.vk_api.ts))
@@ -0,0 +1,167 @@
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from enum import StrEnum, auto
+from logging import getLogger
+from typing import TypeVar
+
+from aiohttp import ClientConnectorError, ClientError
+
+from .errors import (
+    INTERNAL_SERVER_ERROR,
+    UNKNOWN_ERROR,
+    CircuitOpenError,
+    VkApiError,
+)
+
+T = TypeVar("T")
+
+RETRYABLE_ERROR_CODES = frozenset({UNKNOWN_ERROR, INTERNAL_SERVER_ERROR})
+# messages.send is deduplicated by VK through random_id, which a retry reuses.
+IDEMPOTENT_METHODS = frozenset(
+    {
+        "groups.getLongPollServer",
+        "photos.getMessagesUploadServer",
+        "messages.getConversationMembers",
+        "users.get",
+        "messages.send",
+    }
+)
+
+
+class CircuitState(StrEnum):
+    closed = auto()
+    open = auto()
+    half_open = auto()
+
+
+@dataclass
+class RetryStats:
+    retries: int = 0
+    gave_up: int = 0
+    circuit_opened: int = 0
+    rejected: int = 0
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_progress = False
+
+    @property
+    def retry_after(self) -> float:
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == CircuitState.open and not self.retry_after:
+            self.state = CircuitState.half_open
+        if self.state == CircuitState.closed:
+            return True
+        if self.state == CircuitState.half_open and not self.trial_in_progress:
+            self.trial_in_progress = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = CircuitState.closed
+        self.failures = 0
+        self.trial_in_progress = False
+
+    def record_failure(self) -> bool:
+        self.failures += 1
+        self.trial_in_progress = False
+        if (
+            self.state == CircuitState.half_open
+            or self.failures >= self.failure_threshold
+        ) and self.state != CircuitState.open:
+            self.state = CircuitState.open
+            self.opened_at = time.monotonic()
+            return True
+        return False
+
+    def release(self) -> None:
+        self.trial_in_progress = False
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        breaker: CircuitBreaker,
+    ) -> None:
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker
+        self.logger = getLogger("retry")
+        self.stats = RetryStats()
+
+    @staticmethod
+    def is_transient(error: Exception) -> bool:
+        if isinstance(error, VkApiError):
+            return error.error_code in RETRYABLE_ERROR_CODES
+        return isinstance(error, ClientError | TimeoutError)
+
+    @staticmethod
+    def is_retryable(method: str, error: Exception) -> bool:
+        if isinstance(error, ClientConnectorError):
+            return True
+        return method in IDEMPOTENT_METHODS and RetryPolicy.is_transient(error)
+
+    def backoff(self, attempt: int) -> float:
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2**attempt)
+        )
+
+    async def call(self, method: str, request: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                self.stats.rejected += 1
+                raise CircuitOpenError(self.breaker.retry_after)
+            try:
+                result = await request()
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if isinstance(e, VkApiError) and not self.is_transient(e):
+                    # VK answered, so the API itself is healthy.
+                    self.breaker.record_success()
+                    raise
+                if not self.is_transient(e):
+                    self.breaker.release()
+                    raise
+                if self.breaker.record_failure():
+                    self.stats.circuit_opened += 1
+                    self.logger.warning(
+                        "VK API circuit opened for %s s",
+                        self.breaker.reset_timeout,
+                    )
+                if attempt >= self.max_retries or not self.is_retryable(
+                    method, e
+                ):
+                    self.stats.gave_up += 1
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                self.stats.retries += 1
+                self.logger.warning(
+                    "%s failed with %r, retry %s in %.2f s",
+                    method,
+                    e,
+                    attempt,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
@@ -0,0 +1,84 @@
+import time
+import typing
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from app.base.cache import LRUCache
+
+from .dataclasses import Action, Profile
+
+if typing.TYPE_CHECKING:
+    from .accessor import VkApiAccessor
+
+INVITE_ACTIONS = frozenset({"chat_invite_user", "chat_invite_user_by_link"})
+KICK_ACTION = "chat_kick_user"
+
+
+@dataclass
+class Roster:
+    profiles: dict[int, Profile]
+    fetched_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class RosterStats:
+    fetches: int = 0
+    revalidations: int = 0
+    invites: int = 0
+    kicks: int = 0
+
+
+class RosterCache:
+    def __init__(self, vk_api: "VkApiAccessor", maxsize: int, ttl: float):
+        self.vk_api = vk_api
+        self.ttl = ttl
+        self.rosters = LRUCache(maxsize=maxsize)
+        self.stats = RosterStats()
+
+    def get(self, peer_id: int) -> Roster | None:
+        roster = self.rosters.get(peer_id)
+        if roster is None:
+            return None
+        if time.monotonic() - roster.fetched_at >= self.ttl:
+            self.stats.revalidations += 1
+            self.rosters.pop(peer_id)
+            return None
+        return roster
+
+    def invalidate(self, peer_id: int) -> None:
+        self.rosters.pop(peer_id)
+
+    async def iter_profiles(self, peer_id: int) -> AsyncIterator[list[Profile]]:
+        roster = self.get(peer_id)
+        if roster is not None:
+            yield list(roster.profiles.values())
+            return
+
+        self.stats.fetches += 1
+        profiles = {}
+        async for page in self.vk_api.iter_chat_members(peer_id):
+            profiles.update((profile.id, profile) for profile in page)
+            yield page
+        self.rosters.set(peer_id, Roster(profiles=profiles))
+
+    async def apply_action(
+        self, peer_id: int, action: Action, from_id: int
+    ) -> None:
+        roster = self.get(peer_id)
+        if roster is None:
+            return
+
+        if action.type in INVITE_ACTIONS:
+            member_id = action.member_id or from_id
+            if member_id < 0:
+                return
+            self.stats.invites += 1
+            try:
+                profile = await self.vk_api.get_user_profile(member_id)
+            except Exception:
+                self.rosters.pop(peer_id)
+                return
+            roster.profiles[member_id] = profile
+        elif action.type == KICK_ACTION and action.member_id is not None:
+            self.stats.kicks += 1
+            roster.profiles.pop(action.member_id, None)
@@ -0,0 +1,10 @@
+import typing
+
+if typing.TYPE_CHECKING:
+    from app.web.app import Application
+
+
+def setup_routes(app: "Application"):
+    from app.vk_api.views import CallbackView
+
+    app.router.add_view("/vk.callback", CallbackView)
@@ -0,0 +1,243 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from logging import getLogger
+
+from .errors import TOO_MANY_REQUESTS, SchedulerStoppedError, VkApiError
+
+PRIORITY_METHODS = frozenset({"messages.sendMessageEventAnswer"})
+MAX_RATE_LIMIT_RETRIES = 3
+
+
+@dataclass
+class OutboundCall:
+    method: str
+    params: dict
+    peer_id: int | None
+    future: asyncio.Future
+    enqueued_at: float
+    attempts: int = 0
+
+
+@dataclass
+class SchedulerStats:
+    sent: int = 0
+    requests: int = 0
+    batched_calls: int = 0
+    rate_limit_hits: int = 0
+    total_queue_wait: float = 0.0
+    max_queue_wait: float = 0.0
+
+    @property
+    def avg_queue_wait(self) -> float:
+        if not self.sent:
+            return 0.0
+        return self.total_queue_wait / self.sent
+
+    @property
+    def calls_per_request(self) -> float:
+        if not self.requests:
+            return 0.0
+        return self.sent / self.requests
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    async def acquire(self) -> None:
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+    def drain(self) -> None:
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        send: Callable[[str, dict], Awaitable[dict]],
+        rate: float,
+        send_batch: Callable[
+            [list[tuple[str, dict]]], Awaitable[list[dict | VkApiError]]
+        ]
+        | None = None,
+        batch_size: int = 1,
+    ) -> None:
+        self.send = send
+        self.send_batch = send_batch
+        self.batch_size = batch_size if send_batch else 1
+        self.bucket = TokenBucket(rate=rate, capacity=rate)
+        self.logger = getLogger("scheduler")
+        self.priority: deque[OutboundCall] = deque()
+        self.queues: OrderedDict[int | None, deque[OutboundCall]] = (
+            OrderedDict()
+        )
+        self.in_flight_peers: set[int] = set()
+        self.wakeup = asyncio.Event()
+        self.stats = SchedulerStats()
+        self.task: asyncio.Task | None = None
+        self.send_tasks: set[asyncio.Task] = set()
+
+    @property
+    def depth(self) -> int:
+        return len(self.priority) + sum(map(len, self.queues.values()))
+
+    async def submit(
+        self, method: str, params: dict, peer_id: int | None = None
+    ) -> dict:
+        call = OutboundCall(
+            method=method,
+            params=params,
+            peer_id=peer_id,
+            future=asyncio.get_running_loop().create_future(),
+            enqueued_at=time.monotonic(),
+        )
+        self._enqueue(call)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        return await call.future
+
+    async def stop(self) -> None:
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+        await asyncio.gather(*self.send_tasks, return_exceptions=True)
+        # Whoever is still waiting for a queued call would hang forever.
+        # In-flight sends are done by now, rate limited ones requeued.
+        pending = [*self.priority]
+        for queue in self.queues.values():
+            pending.extend(queue)
+        self.priority.clear()
+        self.queues.clear()
+        for call in pending:
+            if not call.future.done():
+                call.future.set_exception(SchedulerStoppedError())
+
+    def _enqueue(self, call: OutboundCall, first: bool = False) -> None:
+        if call.method in PRIORITY_METHODS:
+            queue = self.priority
+        else:
+            queue = self.queues.setdefault(call.peer_id, deque())
+        if first:
+            queue.appendleft(call)
+        else:
+            queue.append(call)
+        self.wakeup.set()
+
+    def _next_batch(self) -> list[OutboundCall]:
+        batch = []
+        while self.priority and len(batch) < self.batch_size:
+            batch.append(self.priority.popleft())
+
+        for peer_id in list(self.queues):
+            if len(batch) >= self.batch_size:
+                break
+            if peer_id in self.in_flight_peers:
+                continue
+            queue = self.queues.pop(peer_id)
+            while queue and len(batch) < self.batch_size:
+                batch.append(queue.popleft())
+            if queue:
+                self.queues[peer_id] = queue
+            if peer_id is not None:
+                self.in_flight_peers.add(peer_id)
+        return batch
+
+    async def run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            try:
+                await self.bucket.acquire()
+            except asyncio.CancelledError:
+                # Stopped while waiting for a token: hand the batch back,
+                # stop() fails whatever is left in the queues.
+                for call in reversed(batch):
+                    self.in_flight_peers.discard(call.peer_id)
+                    self._enqueue(call, first=True)
+                raise
+            now = time.monotonic()
+            for call in batch:
+                wait = now - call.enqueued_at
+                self.stats.total_queue_wait += wait
+                self.stats.max_queue_wait = max(self.stats.max_queue_wait, wait)
+            self.stats.sent += len(batch)
+            self.stats.requests += 1
+            if len(batch) > 1:
+                self.stats.batched_calls += len(batch)
+
+            task = asyncio.create_task(self._send(batch))
+            self.send_tasks.add(task)
+            task.add_done_callback(self.send_tasks.discard)
+
+    async def _send(self, batch: list[OutboundCall]) -> None:
+        try:
+            if len(batch) == 1:
+                results = [await self._send_one(batch[0])]
+            else:
+                results = await self.send_batch(
+                    [(call.method, call.params) for call in batch]
+                )
+        except Exception as e:
+            results = [e] * len(batch)
+        finally:
+            for call in batch:
+                if call.method not in PRIORITY_METHODS:
+                    self.in_flight_peers.discard(call.peer_id)
+            self.wakeup.set()
+
+        # Reversed, so that rate limited calls return to the queue heads
+        # in their original order.
+        for call, result in zip(
+            reversed(batch), reversed(results), strict=True
+        ):
+            self._resolve(call, result)
+
+    async def _send_one(self, call: OutboundCall) -> dict | Exception:
+        try:
+            return await self.send(call.method, call.params)
+        except Exception as e:
+            return e
+
+    def _resolve(self, call: OutboundCall, result: dict | Exception) -> None:
+        if (
+            isinstance(result, VkApiError)
+            and result.error_code == TOO_MANY_REQUESTS
+            and call.attempts < MAX_RATE_LIMIT_RETRIES
+        ):
+            self.stats.rate_limit_hits += 1
+            self.logger.warning(
+                "VK API rate limit hit, requeue %s", call.method
+            )
+            call.attempts += 1
+            self.bucket.drain()
+            self._enqueue(call, first=True)
+            return
+        if call.future.done():
+            return
+        if isinstance(result, Exception):
+            call.future.set_exception(result)
+        else:
+            call.future.set_result(result)
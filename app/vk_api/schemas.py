@@ -35,7 +35,7 @@ class ProfileSchema(Schema):
 
 
 class ProfileListSchema(Schema):
-    profiles = fields.List(fields.Nested(ProfileSchema))
+    profiles = fields.List(fields.Nested(ProfileSchema), load_default=list)
 
     @post_load
     def make_profile_list(self, data, **kwargs):
@@ -92,6 +92,7 @@ class UploadPhotoSchema(Schema):
 
 class PayloadSchema(Schema):
     button = fields.Str()
+    player_id = fields.Int()
 
     @post_load
     def make_payload(self, data, **kwargs):
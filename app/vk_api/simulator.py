@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from collections import Counter, deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from aiohttp import web
+
+from app.base import codec
+
+from .errors import INTERNAL_SERVER_ERROR, TOO_MANY_REQUESTS
+from .transport import API_VERSION
+
+EXECUTE_CALL_RE = re.compile(r"API\.([\w.]+)\(")
+HISTORY_SIZE = 10000
+SIMULATOR_GROUP_ID = 1
+AVATAR_SIZE = 16 * 1024
+
+
+def parse_execute_code(code: str) -> list[tuple[str, dict]]:
+    decoder = json.JSONDecoder()
+    calls = []
+    position = 0
+    while match := EXECUTE_CALL_RE.search(code, position):
+        params, position = decoder.raw_decode(code, match.end())
+        calls.append((match.group(1), params))
+    return calls
+
+
+class SimulatedError(Exception):
+    def __init__(self, error_code: int, error_msg: str):
+        self.error_code = error_code
+        self.error_msg = error_msg
+        super().__init__(error_msg)
+
+    def to_dict(self, method: str) -> dict:
+        return {
+            "method": method,
+            "error_code": self.error_code,
+            "error_msg": self.error_msg,
+        }
+
+
+@dataclass
+class SimulatorStats:
+    calls: Counter = field(default_factory=Counter)
+    injected_errors: int = 0
+    rate_limited: int = 0
+    messages_sent: int = 0
+    photos_uploaded: int = 0
+
+
+class RateLimiter:
+    def __init__(self, rate: float) -> None:
+        self.rate = rate
+        self.calls: deque[float] = deque()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        now = time.monotonic()
+        while self.calls and now - self.calls[0] >= 1:
+            self.calls.popleft()
+        if len(self.calls) >= self.rate:
+            return False
+        self.calls.append(now)
+        return True
+
+
+class VkSimulator:
+    def __init__(
+        self,
+        chats: int = 10,
+        members: int = 5,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        base_url: str = "",
+    ) -> None:
+        self.base_url = base_url
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.stats = SimulatorStats()
+        self.key = "simulator-key"
+        self.ts = 1
+        self.history: deque[tuple[int, dict]] = deque(maxlen=HISTORY_SIZE)
+        self.new_events = asyncio.Condition()
+        self.next_photo_id = 1
+        # Called with the params of every messages.send, e.g. by load tests
+        # that react to the keyboards the bot shows.
+        self.message_handlers: list[Callable[[dict], None]] = []
+        self.chats = {
+            2000000000 + chat: [
+                100000 * chat + member for member in range(1, members + 1)
+            ]
+            for chat in range(1, chats + 1)
+        }
+        self.methods = {
+            "groups.getLongPollServer": self.get_long_poll_server,
+            "messages.send": self.send_message,
+            "messages.sendMessageEventAnswer": self.send_event_answer,
+            "messages.getConversationMembers": self.get_conversation_members,
+            "users.get": self.get_users,
+            "photos.getMessagesUploadServer": self.get_upload_server,
+            "photos.saveMessagesPhoto": self.save_photo,
+        }
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/method/{method}", self.handle_method)
+        app.router.add_get("/long_poll", self.handle_long_poll)
+        app.router.add_post("/upload", self.handle_upload)
+        app.router.add_get("/avatars/{user_id}.jpg", self.handle_avatar)
+        app.router.add_post("/simulator/messages", self.handle_push_message)
+        app.router.add_post("/simulator/events", self.handle_push_event)
+        app.router.add_get("/simulator/stats", self.handle_stats)
+        return app
+
+    # Events
+
+    async def push(self, update_type: str, obj: dict) -> int:
+        async with self.new_events:
+            self.ts += 1
+            self.history.append(
+                (
+                    self.ts,
+                    {
+                        "group_id": SIMULATOR_GROUP_ID,
+                        "type": update_type,
+                        "event_id": hashlib.sha1(
+                            str(self.ts).encode()
+                        ).hexdigest(),
+                        "v": API_VERSION,
+                        "object": obj,
+                    },
+                )
+            )
+            self.new_events.notify_all()
+        return self.ts
+
+    async def push_message(self, peer_id: int, from_id: int, text: str) -> int:
+        return await self.push(
+            "message_new",
+            {
+                "message": {
+                    "date": int(time.time()),
+                    "from_id": from_id,
+                    "id": 0,
+                    "peer_id": peer_id,
+                    "text": text,
+                    "conversation_message_id": self.ts,
+                },
+                "client_info": {"keyboard": True, "inline_keyboard": True},
+            },
+        )
+
+    async def push_event(
+        self, peer_id: int, user_id: int, button: str, **payload: Any
+    ) -> int:
+        return await self.push(
+            "message_event",
+            {
+                "user_id": user_id,
+                "peer_id": peer_id,
+                "event_id": f"event{self.ts}",
+                "payload": {"button": button, **payload},
+            },
+        )
+
+    def events_since(self, ts: int) -> list[dict]:
+        return [event for event_ts, event in self.history if event_ts > ts]
+
+    # HTTP handlers
+
+    async def handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.post())
+        self.stats.calls[method] += 1
+
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+
+        try:
+            self._check_limits()
+            if method == "execute":
+                response = await self.execute(params["code"])
+            else:
+                response = {"response": await self.call(method, params)}
+        except SimulatedError as e:
+            response = {"error": e.to_dict(method)}
+        return web.Response(
+            body=codec.dumps_bytes(response), content_type="application/json"
+        )
+
+    def _check_limits(self) -> None:
+        if not self.rate_limiter.allow():
+            self.stats.rate_limited += 1
+            raise SimulatedError(
+                TOO_MANY_REQUESTS, "Too many requests per second"
+            )
+        if self.error_rate and random.random() < self.error_rate:
+            self.stats.injected_errors += 1
+            raise SimulatedError(INTERNAL_SERVER_ERROR, "Internal server error")
+
+    async def call(self, method: str, params: dict) -> dict | list | int:
+        handler = self.methods.get(method)
+        if handler is None:
+            raise SimulatedError(3, "Unknown method passed")
+        return await handler(params)
+
+    async def execute(self, code: str) -> dict:
+        results, errors = [], []
+        for method, params in parse_execute_code(code):
+            self.stats.calls[method] += 1
+            try:
+                results.append(await self.call(method, params))
+            except SimulatedError as e:
+                results.append(False)
+                errors.append(e.to_dict(method))
+        response = {"response": results}
+        if errors:
+            response["execute_errors"] = errors
+        return response
+
+    async def handle_long_poll(self, request: web.Request) -> web.Response:
+        if request.query.get("key") != self.key:
+            return web.json_response({"failed": 2})
+        ts = int(request.query["ts"])
+        if self.history and ts < self.history[0][0] - 1:
+            return web.json_response({"failed": 1, "ts": str(self.ts)})
+
+        wait = float(request.query.get("wait", 25))
+        async with self.new_events:
+            if not self.events_since(ts):
+                try:
+                    await asyncio.wait_for(self.new_events.wait(), wait)
+                except TimeoutError:
+                    pass
+            updates = self.events_since(ts)
+        return web.Response(
+            body=codec.dumps_bytes({"ts": str(self.ts), "updates": updates}),
+            content_type="application/json",
+        )
+
+    async def handle_upload(self, request: web.Request) -> web.Response:
+        reader = await request.multipart()
+        part = await reader.next()
+        hasher = hashlib.sha256()
+        while chunk := await part.read_chunk():
+            hasher.update(chunk)
+        self.stats.photos_uploaded += 1
+        return web.json_response(
+            {
+                "server": 1,
+                "photo": codec.dumps([{"photo": hasher.hexdigest()}]),
+                "hash": hasher.hexdigest()[:32],
+            }
+        )
+
+    async def handle_avatar(self, request: web.Request) -> web.Response:
+        user_id = request.match_info["user_id"]
+        seed = hashlib.sha256(user_id.encode()).digest()
+        return web.Response(
+            body=seed * (AVATAR_SIZE // len(seed)), content_type="image/jpeg"
+        )
+
+    async def handle_push_message(self, request: web.Request) -> web.Response:
+        data = await request.json(loads=codec.loads)
+        ts = await self.push_message(
+            data["peer_id"], data["from_id"], data["text"]
+        )
+        return web.json_response({"ts": ts})
+
+    async def handle_push_event(self, request: web.Request) -> web.Response:
+        data = await request.json(loads=codec.loads)
+        ts = await self.push_event(
+            data["peer_id"], data["user_id"], data["button"]
+        )
+        return web.json_response({"ts": ts})
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "calls": dict(self.stats.calls),
+                "injected_errors": self.stats.injected_errors,
+                "rate_limited": self.stats.rate_limited,
+                "messages_sent": self.stats.messages_sent,
+                "photos_uploaded": self.stats.photos_uploaded,
+                "ts": self.ts,
+            }
+        )
+
+    # API methods
+
+    async def get_long_poll_server(self, params: dict) -> dict:
+        return {
+            "key": self.key,
+            "server": f"{self.base_url}/long_poll",
+            "ts": str(self.ts),
+        }
+
+    async def send_message(self, params: dict) -> int:
+        self.stats.messages_sent += 1
+        for handler in self.message_handlers:
+            handler(params)
+        return self.stats.messages_sent
+
+    async def send_event_answer(self, params: dict) -> int:
+        return 1
+
+    def _profile(self, user_id: int) -> dict:
+        return {
+            "id": user_id,
+            "first_name": "Игрок",
+            "last_name": str(user_id),
+            "screen_name": f"id{user_id}",
+            "photo_100": f"{self.base_url}/avatars/{user_id}.jpg",
+        }
+
+    async def get_conversation_members(self, params: dict) -> dict:
+        members = self.chats.get(int(params["peer_id"]))
+        if members is None:
+            raise SimulatedError(917, "You don't have access to this chat")
+        offset = int(params.get("offset", 0))
+        page = members[offset : offset + int(params.get("count", 20))]
+        return {
+            "count": len(members),
+            "items": [{"member_id": member_id} for member_id in page],
+            "profiles": [self._profile(member_id) for member_id in page],
+        }
+
+    async def get_users(self, params: dict) -> list[dict]:
+        return [
+            self._profile(int(user_id))
+            for user_id in str(params["user_ids"]).split(",")
+        ]
+
+    async def get_upload_server(self, params: dict) -> dict:
+        return {"album_id": -3, "upload_url": f"{self.base_url}/upload"}
+
+    async def save_photo(self, params: dict) -> list[dict]:
+        photo_id = self.next_photo_id
+        self.next_photo_id += 1
+        return [
+            {"id": photo_id, "owner_id": -SIMULATOR_GROUP_ID, "album_id": -3}
+        ]
+
+
+async def serve(simulator: VkSimulator, host: str, port: int) -> None:
+    simulator.base_url = f"http://{host}:{port}"
+    runner = web.AppRunner(simulator.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    await asyncio.Event().wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local VK API simulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--chats", type=int, default=10)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    args = parser.parse_args()
+
+    simulator = VkSimulator(
+        chats=args.chats,
+        members=args.members,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+    )
+    asyncio.run(serve(simulator, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from urllib.parse import urlencode, urljoin
+
+from aiohttp import (
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+    TraceConfig,
+    TraceConnectionCreateEndParams,
+    TraceConnectionReuseconnParams,
+)
+
+from app.base import codec
+
+API_PATH = "https://api.vk.com/method/"
+API_VERSION = "5.131"
+# Longer queries (execute code, keyboards) go in a form body instead of the URL.
+MAX_QUERY_LENGTH = 2048
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+LONG_POLL_ENDPOINT = "long_poll"
+
+
+@dataclass
+class EndpointStats:
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def avg(self) -> float:
+        if not self.count:
+            return 0.0
+        return self.total / self.count
+
+    def add(self, duration: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total += duration
+        self.max = max(self.max, duration)
+
+
+@dataclass
+class TransportStats:
+    endpoints: dict[str, EndpointStats] = field(default_factory=dict)
+    connections_created: int = 0
+    connections_reused: int = 0
+
+    @property
+    def reuse_rate(self) -> float:
+        total = self.connections_created + self.connections_reused
+        if not total:
+            return 0.0
+        return self.connections_reused / total
+
+    def endpoint(self, name: str) -> EndpointStats:
+        return self.endpoints.setdefault(name, EndpointStats())
+
+
+class VkTransport:
+    def __init__(
+        self,
+        token: str,
+        api_path: str = API_PATH,
+        api_timeout: float = 10,
+        connect_timeout: float = 5,
+        long_poll_wait: int = 30,
+        pool_limit: int = 100,
+        pool_limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 30,
+    ) -> None:
+        self.api_path = api_path
+        self.long_poll_wait = long_poll_wait
+        self.pool_limit = pool_limit
+        self.pool_limit_per_host = pool_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.api_timeout = ClientTimeout(
+            total=api_timeout, connect=connect_timeout
+        )
+        # The server holds a long poll request for up to `wait` seconds.
+        self.long_poll_timeout = ClientTimeout(
+            total=None,
+            connect=connect_timeout,
+            sock_read=long_poll_wait + api_timeout,
+        )
+        self.auth_query = urlencode({"access_token": token, "v": API_VERSION})
+        self.session: ClientSession | None = None
+        self.stats = TransportStats()
+
+    def connect(self) -> ClientSession:
+        trace_config = TraceConfig()
+        trace_config.on_connection_create_end.append(
+            self._on_connection_create_end
+        )
+        trace_config.on_connection_reuseconn.append(self._on_connection_reuse)
+        self.session = ClientSession(
+            connector=TCPConnector(
+                ssl=False,
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            ),
+            trace_configs=[trace_config],
+        )
+        return self.session
+
+    async def close(self) -> None:
+        if self.session:
+            await self.session.close()
+            self.session = None
+
+    async def _on_connection_create_end(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: TraceConnectionCreateEndParams,
+    ) -> None:
+        self.stats.connections_created += 1
+
+    async def _on_connection_reuse(
+        self,
+        session: ClientSession,
+        context: SimpleNamespace,
+        params: TraceConnectionReuseconnParams,
+    ) -> None:
+        self.stats.connections_reused += 1
+
+    @asynccontextmanager
+    async def measure(self, endpoint: str) -> AsyncIterator[None]:
+        started_at = time.monotonic()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.stats.endpoint(endpoint).add(
+                time.monotonic() - started_at, failed
+            )
+
+    async def call_api(self, method: str, params: dict) -> dict:
+        url = urljoin(self.api_path, method)
+        query = self.encode(params)
+        if len(query) > MAX_QUERY_LENGTH:
+            request = self.session.post(
+                url,
+                data=query.encode(),
+                headers={"Content-Type": FORM_CONTENT_TYPE},
+                timeout=self.api_timeout,
+            )
+        else:
+            request = self.session.get(
+                f"{url}?{query}", timeout=self.api_timeout
+            )
+        async with self.measure(method), request as response:
+            return await response.json(loads=codec.loads)
+
+    async def long_poll(self, server: str, key: str, ts: int | str) -> dict:
+        query = urlencode(
+            {
+                "act": "a_check",
+                "key": key,
+                "ts": ts,
+                "wait": self.long_poll_wait,
+            }
+        )
+        async with (
+            self.measure(LONG_POLL_ENDPOINT),
+            self.session.get(
+                f"{server}?{query}", timeout=self.long_poll_timeout
+            ) as response,
+        ):
+            return await response.json(loads=codec.loads)
+
+    def encode(self, params: dict) -> str:
+        if not params:
+            return self.auth_query
+        return f"{urlencode(params)}&{self.auth_query}"
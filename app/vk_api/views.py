@@ -0,0 +1,43 @@
+from aiohttp.web import HTTPBadRequest, HTTPForbidden, HTTPNotFound, Response
+from marshmallow import ValidationError
+
+from app.base import codec
+from app.web.app import View
+from app.web.config import UpdatesMode
+
+from .decoder import decode_update
+
+CONFIRMATION_TYPE = "confirmation"
+
+
+class CallbackView(View):
+    async def post(self):
+        config = self.request.app.config.bot
+        # In long poll mode nothing may inject updates through here.
+        if config.updates_mode != UpdatesMode.callback:
+            raise HTTPNotFound
+        try:
+            body = await self.request.json(loads=codec.loads)
+        except ValueError as e:
+            raise HTTPBadRequest from e
+        if not isinstance(body, dict):
+            raise HTTPBadRequest
+
+        if str(body.get("group_id")) != str(config.group_id):
+            raise HTTPForbidden
+        if body.get("secret") != config.callback_secret:
+            raise HTTPForbidden
+
+        if body.get("type") == CONFIRMATION_TYPE:
+            return Response(text=config.callback_confirmation)
+
+        try:
+            update = decode_update(body)
+        except ValidationError:
+            self.request.app.logger.warning(
+                "Unparsed callback update: %s", body
+            )
+            return Response(text="ok")
+
+        await self.store.vk_api.update_queue.put(update)
+        return Response(text="ok")
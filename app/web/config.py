@@ -1,6 +1,7 @@
 import os
 import typing
 from dataclasses import dataclass
+from enum import StrEnum, auto
 
 from dotenv import load_dotenv
 
@@ -15,11 +16,51 @@ port = os.getenv("DB_PORT")
 user = os.getenv("DB_USER")
 password = os.getenv("DB_PASSWORD")
 database = os.getenv("DB_NAME")
+# A handled update holds one connection for its whole unit of work, and at
+# most DB_POOL_SIZE units run at once: keep it at or above
+# BOT_UPDATE_WORKERS. DB_MAX_OVERFLOW is the headroom for the connections
+# taken beside the units (photo upload subtasks, checkpoint saves), so a
+# handler waiting on its subtasks can't starve them.
+pool_size = int(os.getenv("DB_POOL_SIZE", "60"))
+max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "40"))
 
 
 # BOT SETTINGS
 token = os.getenv("VK_TOKEN")
 group_id = os.getenv("GROUP_ID")
+max_concurrent_chats = int(os.getenv("BOT_MAX_CONCURRENT_CHATS", "100"))
+update_queue_size = int(os.getenv("BOT_UPDATE_QUEUE_SIZE", "1000"))
+update_workers = int(os.getenv("BOT_UPDATE_WORKERS", "50"))
+photo_upload_concurrency = int(os.getenv("BOT_PHOTO_UPLOAD_CONCURRENCY", "10"))
+avatar_cache_size = int(os.getenv("BOT_AVATAR_CACHE_SIZE", "10000"))
+avatar_cache_ttl = int(os.getenv("BOT_AVATAR_CACHE_TTL", "86400"))
+roster_cache_size = int(os.getenv("BOT_ROSTER_CACHE_SIZE", "10000"))
+# A cached roster also skips the members call that checks the bot is still
+# an admin: a demotion only shows up after the TTL or a permission error.
+roster_cache_ttl = int(os.getenv("BOT_ROSTER_CACHE_TTL", "3600"))
+# Unused in callback mode, where replicas would not see each other's writes.
+chat_state_cache_size = int(os.getenv("BOT_CHAT_STATE_CACHE_SIZE", "10000"))
+stream_photo_uploads = os.getenv("BOT_STREAM_PHOTO_UPLOADS", "True") == "True"
+max_photo_size = int(os.getenv("BOT_MAX_PHOTO_SIZE", str(10 * 1024 * 1024)))
+api_path = os.getenv("VK_API_PATH", "https://api.vk.com/method/")
+api_rate_limit = float(os.getenv("VK_API_RATE_LIMIT", "20"))
+api_execute_batch_size = int(os.getenv("VK_API_EXECUTE_BATCH_SIZE", "25"))
+api_timeout = float(os.getenv("VK_API_TIMEOUT", "10"))
+connect_timeout = float(os.getenv("VK_CONNECT_TIMEOUT", "5"))
+long_poll_wait = int(os.getenv("VK_LONG_POLL_WAIT", "30"))
+pool_limit = int(os.getenv("VK_POOL_LIMIT", "100"))
+pool_limit_per_host = int(os.getenv("VK_POOL_LIMIT_PER_HOST", "20"))
+dns_cache_ttl = int(os.getenv("VK_DNS_CACHE_TTL", "300"))
+keepalive_timeout = float(os.getenv("VK_KEEPALIVE_TIMEOUT", "30"))
+api_max_retries = int(os.getenv("VK_API_MAX_RETRIES", "3"))
+api_retry_base_delay = float(os.getenv("VK_API_RETRY_BASE_DELAY", "0.5"))
+api_retry_max_delay = float(os.getenv("VK_API_RETRY_MAX_DELAY", "8"))
+circuit_failure_threshold = int(os.getenv("VK_CIRCUIT_FAILURE_THRESHOLD", "5"))
+circuit_reset_timeout = float(os.getenv("VK_CIRCUIT_RESET_TIMEOUT", "30"))
+long_poll_max_backoff = float(os.getenv("VK_LONG_POLL_MAX_BACKOFF", "30"))
+updates_mode = os.getenv("BOT_UPDATES_MODE", "long_poll")
+callback_confirmation = os.getenv("VK_CALLBACK_CONFIRMATION", "")
+callback_secret = os.getenv("VK_CALLBACK_SECRET", "")
 
 
 # SESSION SETTINGS
@@ -31,6 +72,11 @@ email = os.getenv("EMAIL")
 admin_password = os.getenv("ADMIN_PASSWORD")
 
 
+class UpdatesMode(StrEnum):
+    long_poll = auto()
+    callback = auto()
+
+
 @dataclass
 class SessionConfig:
     key: str
@@ -49,12 +95,44 @@ class DatabaseConfig:
     user: str
     password: str
     database: str
+    pool_size: int = 60
+    max_overflow: int = 40
 
 
 @dataclass
 class BotConfig:
     token: str
-    group_id: int
+    group_id: int | None
+    max_concurrent_chats: int = 100
+    update_queue_size: int = 1000
+    update_workers: int = 50
+    photo_upload_concurrency: int = 10
+    avatar_cache_size: int = 10000
+    avatar_cache_ttl: int = 86400
+    roster_cache_size: int = 10000
+    roster_cache_ttl: int = 3600
+    chat_state_cache_size: int = 10000
+    stream_photo_uploads: bool = True
+    max_photo_size: int = 10 * 1024 * 1024
+    api_path: str = "https://api.vk.com/method/"
+    api_rate_limit: float = 20
+    api_execute_batch_size: int = 25
+    api_timeout: float = 10
+    connect_timeout: float = 5
+    long_poll_wait: int = 30
+    pool_limit: int = 100
+    pool_limit_per_host: int = 20
+    dns_cache_ttl: int = 300
+    keepalive_timeout: float = 30
+    api_max_retries: int = 3
+    api_retry_base_delay: float = 0.5
+    api_retry_max_delay: float = 8
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30
+    long_poll_max_backoff: float = 30
+    updates_mode: UpdatesMode = UpdatesMode.long_poll
+    callback_confirmation: str = ""
+    callback_secret: str = ""
 
 
 @dataclass
@@ -66,6 +144,14 @@ class Config:
 
 
 def setup_config(app: "Application"):
+    # The secret is the only thing a forged callback can't copy: the group
+    # id is public.
+    if UpdatesMode(updates_mode) == UpdatesMode.callback and not (
+        callback_secret
+    ):
+        msg = "VK_CALLBACK_SECRET is required in callback mode"
+        raise ValueError(msg)
+
     app.config = Config(
         session=SessionConfig(
             key=key,
@@ -76,7 +162,37 @@ def setup_config(app: "Application"):
         ),
         bot=BotConfig(
             token=token,
-            group_id=group_id,
+            group_id=int(group_id) if group_id else None,
+            max_concurrent_chats=max_concurrent_chats,
+            update_queue_size=update_queue_size,
+            update_workers=update_workers,
+            photo_upload_concurrency=photo_upload_concurrency,
+            avatar_cache_size=avatar_cache_size,
+            avatar_cache_ttl=avatar_cache_ttl,
+            roster_cache_size=roster_cache_size,
+            roster_cache_ttl=roster_cache_ttl,
+            chat_state_cache_size=chat_state_cache_size,
+            stream_photo_uploads=stream_photo_uploads,
+            max_photo_size=max_photo_size,
+            api_path=api_path,
+            api_rate_limit=api_rate_limit,
+            api_execute_batch_size=api_execute_batch_size,
+            api_timeout=api_timeout,
+            connect_timeout=connect_timeout,
+            long_poll_wait=long_poll_wait,
+            pool_limit=pool_limit,
+            pool_limit_per_host=pool_limit_per_host,
+            dns_cache_ttl=dns_cache_ttl,
+            keepalive_timeout=keepalive_timeout,
+            api_max_retries=api_max_retries,
+            api_retry_base_delay=api_retry_base_delay,
+            api_retry_max_delay=api_retry_max_delay,
+            circuit_failure_threshold=circuit_failure_threshold,
+            circuit_reset_timeout=circuit_reset_timeout,
+            long_poll_max_backoff=long_poll_max_backoff,
+            updates_mode=UpdatesMode(updates_mode),
+            callback_confirmation=callback_confirmation,
+            callback_secret=callback_secret,
         ),
         database=DatabaseConfig(
             host=host,
@@ -84,5 +200,7 @@ def setup_config(app: "Application"):
             user=user,
             password=password,
             database=database,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
         ),
     )
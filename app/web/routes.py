@@ -8,8 +8,10 @@ def setup_routes(app: Application):
     from app.chats.routes import setup_routes as chats_setup_routes
     from app.games.routes import setup_routes as games_setup_routes
     from app.players.routes import setup_routes as players_setup_routes
+    from app.vk_api.routes import setup_routes as vk_api_setup_routes
 
     admin_setup_routes(app)
     chats_setup_routes(app)
     games_setup_routes(app)
     players_setup_routes(app)
+    vk_api_setup_routes(app)
@@ -1,13 +1,16 @@
 from aiohttp.web import json_response as aiohttp_json_response
 from aiohttp.web_response import Response
 
+from app.base import codec
+
 
 def json_response(data: dict | None = None, status: str = "ok") -> Response:
     return aiohttp_json_response(
         data={
             "status": status,
             "data": data or {},
-        }
+        },
+        dumps=codec.dumps,
     )
 
 
@@ -24,4 +27,5 @@ def error_json_response(
             "message": str(message),
             "data": data or {},
         },
+        dumps=codec.dumps,
     )
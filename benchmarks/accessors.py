@@ -0,0 +1,252 @@
+import argparse
+import asyncio
+import logging
+import random
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.database import Database
+from app.games.accessor import GameAccessor
+from app.games.models import GameStatus
+from app.players.accessor import PlayerAccessor
+from app.players.models import PlayerStatus
+from app.store.store import Store
+from app.web.app import Application
+from app.web.config import setup_config
+from benchmarks.report import percentile, save_results
+
+FIRST_CHAT_ID = 2000000000
+USERS_PER_CHAT = 1000
+RESET_TABLES_SQL = "TRUNCATE players, games, chats RESTART IDENTITY CASCADE"
+# Every chat has finished games behind it and one game in progress, whose
+# first two players are the current pair and every second voter has voted.
+SEED_SQL = (
+    """
+    INSERT INTO chats (chat_id, bot_state)
+    SELECT :first_chat_id + chat, 'game_processing'
+    FROM generate_series(1, :chats) AS chat
+    """,
+    """
+    INSERT INTO games (chat_id, status, current_round)
+    SELECT
+        :first_chat_id + chat,
+        CAST(
+            CASE WHEN game = :games THEN 'in_progress' ELSE 'finished' END
+            AS gamestatus
+        ),
+        CASE WHEN game = :games THEN 1 ELSE :players - 1 END
+    FROM generate_series(1, :games) AS game,
+        generate_series(1, :chats) AS chat
+    """,
+    """
+    INSERT INTO players (
+        user_id, username, avatar_url, game_id, status, votes, is_voted
+    )
+    SELECT
+        (games.chat_id - :first_chat_id) * :users_per_chat + player,
+        'id' || ((games.chat_id - :first_chat_id) * :users_per_chat + player),
+        'https://example.com/avatar.jpg',
+        games.id,
+        CAST(
+            CASE
+                WHEN games.status = 'finished' AND player = 1 THEN 'winner'
+                WHEN games.status = 'finished' THEN 'loser'
+                WHEN player <= 2 THEN 'in_game'
+                ELSE 'voting'
+            END
+            AS playerstatus
+        ),
+        CASE WHEN player <= 2 THEN player ELSE 0 END,
+        games.status = 'in_progress' AND player > 2 AND player % 2 = 0
+    FROM games, generate_series(1, :players) AS player
+    """,
+    "ANALYZE chats, games, players",
+)
+HOT_GAMES_SQL = """
+    SELECT
+        id,
+        chat_id,
+        (
+            SELECT min(players.id) FROM players
+            WHERE players.game_id = games.id AND players.status = 'in_game'
+        ) AS first_player_id
+    FROM games
+    WHERE status = 'in_progress'
+    ORDER BY random()
+    LIMIT :limit
+"""
+
+
+@dataclass
+class HotGame:
+    id: int
+    chat_id: int
+    first_player_id: int
+
+    @property
+    def first_user_id(self) -> int:
+        return (self.chat_id - FIRST_CHAT_ID) * USERS_PER_CHAT + 1
+
+
+@dataclass
+class QueryRecorder:
+    statements: list[tuple[str, tuple]] = field(default_factory=list)
+
+    def __call__(self, conn, cursor, statement, parameters, *args) -> None:
+        self.statements.append((statement, parameters))
+
+
+async def seed(
+    engine: AsyncEngine, chats: int, games: int, players: int
+) -> None:
+    params = {
+        "first_chat_id": FIRST_CHAT_ID,
+        "users_per_chat": USERS_PER_CHAT,
+        "chats": chats,
+        "games": games,
+        "players": players,
+    }
+    async with engine.begin() as connection:
+        await connection.execute(text(RESET_TABLES_SQL))
+        for statement in SEED_SQL:
+            await connection.execute(text(statement), params)
+
+
+async def explain(engine: AsyncEngine, statement: str, parameters) -> str:
+    # ANALYZE runs the statement, so writes are rolled back afterwards.
+    async with engine.connect() as connection:
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+        )
+        plan = "\n".join(row[0] for row in result)
+        await connection.rollback()
+    return plan
+
+
+def hot_calls(
+    players: PlayerAccessor, games: GameAccessor
+) -> dict[str, Callable[[HotGame], Awaitable]]:
+    return {
+        "get_game_by_status": lambda game: games.get_game_by_status(
+            chat_id=game.chat_id, status=GameStatus.in_progress
+        ),
+        "get_player_by_user_id": lambda game: players.get_player_by_user_id(
+            game_id=game.id, user_id=game.first_user_id
+        ),
+        "get_players_by_round": lambda game: players.get_players_by_round(
+            current_round=1, game_id=game.id, status=PlayerStatus.voting
+        ),
+        "cast_vote": lambda game: players.cast_vote(
+            game_id=game.id,
+            user_id=game.first_user_id + 2,
+            player_id=game.first_player_id,
+        ),
+        "get_round_result": lambda game: players.get_round_result(
+            game_id=game.id
+        ),
+    }
+
+
+async def measure(args: argparse.Namespace) -> dict:
+    app = Application()
+    setup_config(app)
+    app.database = Database(app)
+    await app.database.connect()
+    engine = app.database.engine
+    store = Store(app)
+
+    try:
+        if not args.skip_seed:
+            started_at = time.perf_counter()
+            await seed(engine, args.chats, args.games, args.players)
+            print(f"seeded in {time.perf_counter() - started_at:.1f} s")
+
+        async with engine.connect() as connection:
+            player_rows = await connection.scalar(
+                text("SELECT count(*) FROM players")
+            )
+            sample = [
+                HotGame(
+                    id=row.id,
+                    chat_id=row.chat_id,
+                    first_player_id=row.first_player_id,
+                )
+                for row in await connection.execute(
+                    text(HOT_GAMES_SQL), {"limit": args.sample}
+                )
+            ]
+
+        results = {}
+        for name, call in hot_calls(store.players, store.games).items():
+            recorder = QueryRecorder()
+            timings = []
+            event.listen(engine.sync_engine, "before_cursor_execute", recorder)
+            for _ in range(args.repeat):
+                game = random.choice(sample)
+                started_at = time.perf_counter()
+                await call(game)
+                timings.append(time.perf_counter() - started_at)
+            event.remove(engine.sync_engine, "before_cursor_execute", recorder)
+            # The plan of the last statement, the one doing the real work.
+            statement, parameters = recorder.statements[-1]
+            results[name] = {
+                "queries_per_call": len(recorder.statements) / args.repeat,
+                "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+                "p50_ms": round(percentile(timings, 0.5) * 1000, 3),
+                "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+                "plan": await explain(engine, statement, parameters),
+            }
+    finally:
+        await engine.dispose()
+
+    return {"player_rows": player_rows, "accessors": results}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time the hot PlayerAccessor and GameAccessor queries on a "
+            "seeded dataset. Seeding truncates chats, games and players, so "
+            "point it at a scratch database."
+        )
+    )
+    parser.add_argument("--chats", type=int, default=5000)
+    parser.add_argument("--games", type=int, default=10, help="per chat")
+    parser.add_argument("--players", type=int, default=20, help="per game")
+    parser.add_argument("--skip-seed", action="store_true")
+    parser.add_argument("--sample", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--plans", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+    logging.basicConfig(level=args.log_level)
+
+    started_at = datetime.now(UTC)
+    results = asyncio.run(measure(args))
+    output = save_results("accessors", args, started_at, results)
+
+    print(f"{results['player_rows']} player rows")
+    print(
+        f"{'accessor':<32}{'queries':>8}{'mean ms':>10}"
+        f"{'p50 ms':>10}{'p99 ms':>10}"
+    )
+    for name, stats in results["accessors"].items():
+        print(
+            f"{name:<32}{stats['queries_per_call']:>8.1f}"
+            f"{stats['mean_ms']:>10.3f}{stats['p50_ms']:>10.3f}"
+            f"{stats['p99_ms']:>10.3f}"
+        )
+        if args.plans:
+            print(stats["plan"], end="\n\n")
+    print(f"saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import json
+import timeit
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAYLOADS_DIR = Path(__file__).parent / "payloads"
+
+
+def load_payloads() -> dict[str, bytes]:
+    return {
+        path.stem: path.read_bytes()
+        for path in sorted(PAYLOADS_DIR.glob("*.json"))
+    }
+
+
+def stdlib_codec() -> tuple[Callable[[Any], str], Callable[[bytes], Any]]:
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    return encoder.encode, json.loads
+
+
+def orjson_codec() -> tuple[Callable[[Any], str], Callable[[bytes], Any]]:
+    def dumps(obj: Any) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+
+    return dumps, orjson.loads
+
+
+def ops_per_second(func: Callable[[], Any], number: int) -> float:
+    best = min(timeit.repeat(func, number=number, repeat=5))
+    return number / best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Encode/decode throughput on recorded VK payloads"
+    )
+    parser.add_argument("--number", type=int, default=10000)
+    args = parser.parse_args()
+
+    codecs = {"json": stdlib_codec}
+    if orjson is None:
+        print("orjson is not installed, only stdlib json is measured")
+    else:
+        codecs["orjson"] = orjson_codec
+
+    print(
+        f"{'payload':<24}{'codec':<8}{'bytes':>8}{'decode/s':>12}{'encode/s':>12}"
+    )
+    for name, raw in load_payloads().items():
+        for codec_name, make_codec in codecs.items():
+            dumps, loads = make_codec()
+            data = loads(raw)
+            decode = ops_per_second(lambda: loads(raw), args.number)  # noqa: B023
+            encode = ops_per_second(lambda: dumps(data), args.number)  # noqa: B023
+            print(
+                f"{name:<24}{codec_name:<8}{len(raw):>8}"
+                f"{decode:>12.0f}{encode:>12.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import argparse
+import json
+import timeit
+from pathlib import Path
+
+from app.vk_api.decoder import decode_update
+from app.vk_api.schemas import UpdateSchema
+
+PAYLOAD = Path(__file__).parent / "payloads" / "long_poll.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Per-update decode cost: marshmallow vs fast decoder"
+    )
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args()
+
+    updates = json.loads(PAYLOAD.read_text())["updates"]
+    schema = UpdateSchema()
+    decoders = {
+        "schema per update": lambda update: UpdateSchema().load(update),
+        "shared schema": schema.load,
+        "fast decoder": decode_update,
+    }
+
+    print(f"{'update type':<16}{'decoder':<20}{'us/update':>10}")
+    for update in updates:
+        for name, decode in decoders.items():
+            best = min(
+                timeit.repeat(
+                    lambda: decode(update),  # noqa: B023
+                    number=args.number,
+                    repeat=5,
+                )
+            )
+            print(
+                f"{update['type']:<16}{name:<20}"
+                f"{best / args.number * 1e6:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+from contextlib import suppress
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from unittest.mock import patch
+
+from aiohttp import web
+from sqlalchemy import event, text
+
+from app.base import codec
+from app.bot.enums import PayloadButton
+from app.bot.states.base.base import BaseState
+from app.bot.states.base.context import StateContext
+from app.vk_api.accessor import EMPTY_KEYBOARD
+from app.vk_api.dataclasses import Update
+from app.vk_api.poller import UpdateQueue
+from app.vk_api.scheduler import TokenBucket
+from app.vk_api.simulator import VkSimulator
+from app.web.app import Application, setup_app
+from app.web.config import UpdatesMode
+from benchmarks.report import percentile, save_results
+
+RESET_TABLES_SQL = (
+    "TRUNCATE players, games, chats, avatar_photos, long_poll_checkpoints "
+    "RESTART IDENTITY CASCADE"
+)
+START_COMMAND = "/start"
+
+current_state: ContextVar[str | None] = ContextVar(
+    "current_state", default=None
+)
+
+
+@dataclass
+class ChatRun:
+    peer_id: int
+    members: list[int]
+    keyboards: asyncio.Queue[list[dict]] = field(default_factory=asyncio.Queue)
+    games: int = 0
+    rounds: int = 0
+    finished: bool = False
+
+
+original_get_state = StateContext.get_state
+
+
+async def recording_get_state(context: StateContext) -> BaseState:
+    state = await original_get_state(context)
+    current_state.set(state.state_name)
+    return state
+
+
+class LoadTest:
+    def __init__(
+        self,
+        simulator: VkSimulator,
+        games: int,
+        vote_rate: float,
+    ) -> None:
+        self.simulator = simulator
+        self.games = games
+        self.bucket = TokenBucket(vote_rate, vote_rate) if vote_rate else None
+        self.runs = {
+            peer_id: ChatRun(peer_id=peer_id, members=members)
+            for peer_id, members in simulator.chats.items()
+        }
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.updates = 0
+        self.queries = 0
+        self.events_pushed = 0
+        simulator.message_handlers.append(self.on_message)
+
+    # Instrumentation
+
+    def instrument(self, app: Application) -> None:
+        event.listen(
+            app.database.engine.sync_engine,
+            "before_cursor_execute",
+            self._count_query,
+        )
+        manager = app.store.bots_manager
+        dispatch = manager._dispatch
+
+        async def timed_dispatch(chat_id: int, update: Update) -> None:
+            token = current_state.set(None)
+            started_at = time.perf_counter()
+            try:
+                await dispatch(chat_id, update)
+            finally:
+                self.updates += 1
+                self.latencies[current_state.get() or "unknown"].append(
+                    time.perf_counter() - started_at
+                )
+                current_state.reset(token)
+
+        manager._dispatch = timed_dispatch
+
+    def _count_query(self, *args) -> None:
+        self.queries += 1
+
+    def on_message(self, params: dict) -> None:
+        keyboard = params.get("keyboard")
+        run = self.runs.get(int(params["peer_id"]))
+        if not keyboard or keyboard == EMPTY_KEYBOARD or run is None:
+            return
+        buttons = [
+            codec.loads(button["action"]["payload"])
+            for row in codec.loads(keyboard)["buttons"]
+            for button in row
+        ]
+        run.keyboards.put_nowait(buttons)
+
+    # Traffic
+
+    async def throttle(self) -> None:
+        if self.bucket:
+            await self.bucket.acquire()
+        self.events_pushed += 1
+
+    async def play(self, run: ChatRun) -> None:
+        await self.throttle()
+        await self.simulator.push_message(
+            run.peer_id, run.members[0], START_COMMAND
+        )
+        await run.keyboards.get()
+        for _ in range(self.games):
+            await self.throttle()
+            await self.simulator.push_event(
+                run.peer_id, run.members[0], PayloadButton.start_game
+            )
+            buttons = await run.keyboards.get()
+            while not any(
+                button["button"] == PayloadButton.start_game
+                for button in buttons
+            ):
+                run.rounds += 1
+                await self.vote(run, buttons)
+                buttons = await run.keyboards.get()
+            run.games += 1
+        run.finished = True
+
+    async def vote(self, run: ChatRun, buttons: list[dict]) -> None:
+        # Everybody backs the first candidate, so rounds never end in a tie.
+        candidate, opponent = buttons[:2]
+        for user_id in run.members:
+            if f"id{user_id}" in (candidate["button"], opponent["button"]):
+                continue
+            await self.throttle()
+            await self.simulator.push_event(run.peer_id, user_id, **candidate)
+
+    async def run(self, update_queue: UpdateQueue, timeout: float) -> float:
+        started_at = time.perf_counter()
+        tasks = [
+            asyncio.create_task(self.play(run)) for run in self.runs.values()
+        ]
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # The last updates of a game are still in flight when its final
+        # keyboard is sent.
+        with suppress(TimeoutError):
+            await asyncio.wait_for(update_queue.queue.join(), timeout)
+        return time.perf_counter() - started_at
+
+    # Report
+
+    def report(self, app: Application, duration: float, calls: Counter) -> dict:
+        rounds = sum(run.rounds for run in self.runs.values())
+        logical_calls = sum(calls.values()) - calls["execute"]
+        vk_api = app.store.vk_api
+        queue_stats = vk_api.update_queue.stats
+        return {
+            "duration": round(duration, 3),
+            "chats_finished": sum(run.finished for run in self.runs.values()),
+            "games": sum(run.games for run in self.runs.values()),
+            "rounds": rounds,
+            "events_pushed": self.events_pushed,
+            "updates": self.updates,
+            "updates_per_second": round(self.updates / duration, 1),
+            "latency_ms": {
+                state: {
+                    "count": len(values),
+                    "p50": round(percentile(values, 0.5) * 1000, 2),
+                    "p99": round(percentile(values, 0.99) * 1000, 2),
+                    "max": round(max(values) * 1000, 2),
+                }
+                for state, values in sorted(self.latencies.items())
+            },
+            "db_queries": self.queries,
+            "db_queries_per_update": round(
+                self.queries / max(self.updates, 1), 2
+            ),
+            "vk_calls": dict(calls),
+            "vk_calls_per_round": round(logical_calls / max(rounds, 1), 2),
+            "vk_requests_per_round": round(
+                vk_api.scheduler.stats.requests / max(rounds, 1), 2
+            ),
+            "unit_of_work": {
+                "statements_per_unit": round(
+                    app.database.stats.statements_per_unit, 2
+                ),
+                "max_statements": app.database.stats.max_statements,
+                "rolled_back": app.database.stats.rolled_back,
+            },
+            "chat_state_cache_hit_rate": round(
+                app.store.chats.states.stats.hit_rate, 3
+            ),
+            "update_queue": {
+                "failed": queue_stats.failed,
+                "avg_lag_ms": round(queue_stats.avg_lag * 1000, 2),
+                "max_lag_ms": round(queue_stats.max_lag * 1000, 2),
+            },
+        }
+
+
+async def reset_database(app: Application) -> None:
+    async with app.database.engine.begin() as connection:
+        await connection.execute(text(RESET_TABLES_SQL))
+
+
+async def start_simulator(simulator: VkSimulator) -> web.AppRunner:
+    runner = web.AppRunner(simulator.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    simulator.base_url = f"http://127.0.0.1:{port}"
+    return runner
+
+
+async def measure(args: argparse.Namespace) -> dict:
+    simulator = VkSimulator(
+        chats=args.chats,
+        members=args.members,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    simulator_runner = await start_simulator(simulator)
+
+    app = setup_app()
+    logging.getLogger().setLevel(args.log_level)
+    app.config.bot.updates_mode = UpdatesMode.long_poll
+    vk_api = app.store.vk_api
+    vk_api.transport.api_path = f"{simulator.base_url}/method/"
+    vk_api.transport.long_poll_wait = 1
+    if args.api_rate_limit:
+        vk_api.scheduler.bucket = TokenBucket(
+            args.api_rate_limit, args.api_rate_limit
+        )
+    app.on_startup.insert(
+        app.on_startup.index(app.database.connect) + 1, reset_database
+    )
+
+    load_test = LoadTest(simulator, games=args.games, vote_rate=args.rate)
+    bot_runner = web.AppRunner(app)
+    try:
+        with patch.object(StateContext, "get_state", recording_get_state):
+            await bot_runner.setup()
+            load_test.instrument(app)
+            calls_before = Counter(simulator.stats.calls)
+            duration = await load_test.run(vk_api.update_queue, args.timeout)
+            calls = simulator.stats.calls - calls_before
+            return load_test.report(app, duration, calls)
+    finally:
+        await bot_runner.cleanup()
+        await simulator_runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Drive simulated chats through full games: Poller, BotManager, "
+            "states, accessors and Postgres. Truncates the bot tables, so "
+            "point it at a scratch database."
+        )
+    )
+    parser.add_argument("--chats", type=int, default=100)
+    parser.add_argument("--members", type=int, default=5)
+    parser.add_argument("--games", type=int, default=1)
+    parser.add_argument(
+        "--rate", type=float, default=0.0, help="events/s, 0 is unlimited"
+    )
+    parser.add_argument("--api-rate-limit", type=float, default=0.0)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", type=Path)
+    args = parser.parse_args()
+
+    started_at = datetime.now(UTC)
+    results = asyncio.run(measure(args))
+    output = save_results("load_test", args, started_at, results)
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
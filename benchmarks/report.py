@@ -0,0 +1,49 @@
+import argparse
+import json
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SKIP_PARAMS = frozenset({"output", "log_level"})
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(
+    name: str,
+    args: argparse.Namespace,
+    started_at: datetime,
+    results: dict,
+) -> Path:
+    document = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "params": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in SKIP_PARAMS
+        },
+        **results,
+    }
+    output = args.output or RESULTS_DIR / (
+        f"{name}-{started_at:%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2, ensure_ascii=False))
+    return output
@@ -0,0 +1,151 @@
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from aiohttp import ClientSession, web
+
+from app.vk_api.accessor import VkApiAccessor
+from app.web.app import Application
+from app.web.config import setup_config
+
+CHUNK_SIZE = 64 * 1024
+
+
+def make_server(photo: bytes) -> web.Application:
+    async def avatar_handler(request: web.Request) -> web.StreamResponse:
+        response = web.StreamResponse()
+        response.content_length = len(photo)
+        await response.prepare(request)
+        view = memoryview(photo)
+        for start in range(0, len(photo), CHUNK_SIZE):
+            await response.write(view[start : start + CHUNK_SIZE])
+        return response
+
+    async def upload_handler(request: web.Request) -> web.Response:
+        reader = await request.multipart()
+        part = await reader.next()
+        size = 0
+        while chunk := await part.read_chunk(CHUNK_SIZE):
+            size += len(chunk)
+        return web.json_response({"server": 1, "photo": str(size), "hash": ""})
+
+    server = web.Application()
+    server.router.add_get("/avatar.jpg", avatar_handler)
+    server.router.add_post("/upload", upload_handler)
+    return server
+
+
+async def serve(photo_size: int) -> None:
+    runner = web.AppRunner(make_server(bytes(photo_size)))
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    print(site._server.sockets[0].getsockname()[1], flush=True)
+    await asyncio.Event().wait()
+
+
+async def measure(mode: str, concurrency: int, port: int) -> dict:
+    app = Application()
+    setup_config(app)
+    app.config.bot.stream_photo_uploads = mode == "stream"
+    app.config.bot.max_photo_size = sys.maxsize
+    vk_api = VkApiAccessor(app)
+    vk_api.session = ClientSession()
+    vk_api.upload_server = f"http://127.0.0.1:{port}/upload"
+    avatar_url = f"http://127.0.0.1:{port}/avatar.jpg"
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    await asyncio.gather(
+        *(vk_api.upload_photo(avatar_url) for _ in range(concurrency))
+    )
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    await vk_api.session.close()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "peak_rss_growth_kb": rss_after - rss_before,
+        "peak_traced_kb": traced_peak // 1024,
+    }
+
+
+def run_child(mode: str, concurrency: int, port: int) -> dict:
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.upload_memory",
+            "--child",
+            "--mode",
+            mode,
+            "--concurrency",
+            str(concurrency),
+            "--port",
+            str(port),
+        ],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Peak memory of avatar uploads: streaming vs buffered"
+    )
+    parser.add_argument("--child", action="store_true")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--mode", default="stream")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--levels", default="1,10,50,100")
+    parser.add_argument("--photo-size", type=int, default=1024 * 1024)
+    args = parser.parse_args()
+
+    if args.serve:
+        asyncio.run(serve(args.photo_size))
+        return
+
+    if args.child:
+        result = asyncio.run(measure(args.mode, args.concurrency, args.port))
+        print(json.dumps(result))
+        return
+
+    with subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "benchmarks.upload_memory",
+            "--serve",
+            "--photo-size",
+            str(args.photo_size),
+        ],
+        stdout=subprocess.PIPE,
+        text=True,
+    ) as server:
+        port = int(server.stdout.readline())
+        print(f"photo size: {args.photo_size} bytes")
+        print(
+            f"{'mode':<10}{'rounds':>8}{'rss growth KB':>16}{'traced KB':>12}"
+        )
+        for mode in ("buffered", "stream"):
+            for level in map(int, args.levels.split(",")):
+                result = run_child(mode, level, port)
+                print(
+                    f"{mode:<10}{level:>8}"
+                    f"{result['peak_rss_growth_kb']:>16}"
+                    f"{result['peak_traced_kb']:>12}"
+                )
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import uuid
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.avatars.models import AvatarPhotoModel
+from app.store import Store
+from app.vk_api.dataclasses import Photo
+
+
+class TestAvatarPhotoAccessor:
+    async def test_save_photo(
+        self, db_sessionmaker: async_sessionmaker[AsyncSession], store: Store
+    ) -> None:
+        avatar_url = f"https://vk.test/{uuid.uuid4()}.jpg"
+
+        avatar_photo = await store.avatars.save_photo(
+            avatar_url=avatar_url,
+            content_hash="hash",
+            photo=Photo(album_id=-3, id=457239017, owner_id=-228),
+        )
+
+        assert isinstance(avatar_photo, AvatarPhotoModel)
+
+        async with db_sessionmaker() as session:
+            result = await session.execute(
+                select(AvatarPhotoModel).where(
+                    AvatarPhotoModel.avatar_url == avatar_url
+                )
+            )
+            db_avatar_photo = result.scalar_one_or_none()
+
+        assert db_avatar_photo is not None
+        assert db_avatar_photo.photo_id == 457239017
+        assert db_avatar_photo.owner_id == -228
+
+    async def test_get_by_avatar_url_uses_memory_tier(
+        self, store: Store
+    ) -> None:
+        avatar_url = f"https://vk.test/{uuid.uuid4()}.jpg"
+        await store.avatars.save_photo(
+            avatar_url=avatar_url,
+            content_hash="hash",
+            photo=Photo(album_id=-3, id=1, owner_id=-228),
+        )
+        store.avatars.cache.clear()
+
+        from_db = await store.avatars.get_by_avatar_url(avatar_url)
+        hits = store.avatars.cache.stats.hits
+        from_memory = await store.avatars.get_by_avatar_url(avatar_url)
+
+        assert from_db.avatar_url == avatar_url
+        assert from_memory is from_db
+        assert store.avatars.cache.stats.hits == hits + 1
+
+    async def test_invalidate_drops_memory_entry(self, store: Store) -> None:
+        avatar_url = f"https://vk.test/{uuid.uuid4()}.jpg"
+        await store.avatars.save_photo(
+            avatar_url=avatar_url,
+            content_hash="hash",
+            photo=Photo(album_id=-3, id=1, owner_id=-228),
+        )
+
+        store.avatars.invalidate(avatar_url)
+
+        assert avatar_url not in store.avatars.cache
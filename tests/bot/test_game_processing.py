@@ -0,0 +1,52 @@
+import asyncio
+import random
+
+import pytest
+
+from app.bot.states.base.context import StateContext
+from app.chats.models import ChatState
+from app.store import Store
+from app.vk_api.dataclasses import Event, Payload
+
+
+class TestGameProcessingState:
+    async def test_vote_for_unknown_username_is_ignored(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        chat_id = random.randint(2000000001, 2100000000)
+        answered = []
+
+        async def send_event_answer(event_obj: Event) -> None:
+            await asyncio.sleep(0)
+            answered.append(event_obj.event_id)
+
+        async def cast_vote(**kwargs) -> None:
+            await asyncio.sleep(0)
+            pytest.fail("a vote without a player was cast")
+
+        monkeypatch.setattr(
+            store.vk_api, "send_event_answer", send_event_answer
+        )
+        monkeypatch.setattr(store.players, "cast_vote", cast_vote)
+        await store.chats.get_or_create_chat(chat_id=chat_id)
+        await store.chats.update_bot_state(
+            chat_id=chat_id, new_state=ChatState.game_processing
+        )
+        await store.games.create_game(chat_id=chat_id, current_round=1)
+        context = StateContext(store.app, chat_id)
+        state = await context.get_state()
+
+        await state.handle_events(
+            event_obj=Event(
+                event_id=1,
+                peer_id=chat_id,
+                from_id=1,
+                payload=Payload(button="renamed_user"),
+            )
+        )
+
+        assert answered == [1]
+        assert (
+            await store.chats.get_bot_state(chat_id)
+            == ChatState.game_processing
+        )
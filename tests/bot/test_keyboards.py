@@ -0,0 +1,41 @@
+import json
+
+from app.bot.enums import PayloadButton
+from app.bot.keyboards import MAIN_KEYBOARD, voting_keyboard
+
+
+def payloads(keyboard: str) -> list[dict]:
+    return [
+        json.loads(button["action"]["payload"])
+        for row in json.loads(keyboard)["buttons"]
+        for button in row
+    ]
+
+
+class TestKeyboards:
+    def test_main_keyboard_is_pre_encoded(self) -> None:
+        assert isinstance(MAIN_KEYBOARD, str)
+        assert payloads(MAIN_KEYBOARD) == [
+            {"button": PayloadButton.start_game},
+            {"button": PayloadButton.get_last_game},
+        ]
+
+    def test_voting_keyboard_is_memoized_per_pair(self) -> None:
+        keyboard = voting_keyboard((57, "alex_petrov"), (58, "mariya.k"))
+
+        assert (
+            voting_keyboard((57, "alex_petrov"), (58, "mariya.k")) is keyboard
+        )
+        assert payloads(keyboard) == [
+            {"button": "alex_petrov", "player_id": 57},
+            {"button": "mariya.k", "player_id": 58},
+            {"button": PayloadButton.cancel_game},
+        ]
+
+    def test_voting_keyboard_escapes_usernames(self) -> None:
+        keyboard = voting_keyboard((1, 'quote"name'), (2, "back\\slash"))
+
+        assert payloads(keyboard)[:2] == [
+            {"button": 'quote"name', "player_id": 1},
+            {"button": "back\\slash", "player_id": 2},
+        ]
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from app.store import Store
+from app.vk_api.dataclasses import Update, UpdateMessage, UpdateObject
+
+
+def make_update(peer_id: int, text: str) -> Update:
+    return Update(
+        type="message_new",
+        object=UpdateObject(
+            message=UpdateMessage(
+                from_id=1,
+                text=text,
+                id=1,
+                peer_id=peer_id,
+            ),
+        ),
+    )
+
+
+class TestBotManager:
+    async def test_handle_updates_dispatches_every_update(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        handled = []
+
+        async def dispatch(chat_id: int, update: Update) -> None:
+            await asyncio.sleep(0)
+            handled.append((chat_id, update.object.message.text))
+
+        monkeypatch.setattr(store.bots_manager, "_dispatch", dispatch)
+        updates = [
+            make_update(peer_id, str(number))
+            for number in range(3)
+            for peer_id in range(2000000001, 2000000051)
+        ]
+
+        await store.bots_manager.handle_updates(updates)
+
+        assert len(handled) == len(updates)
+        for peer_id in range(2000000001, 2000000051):
+            assert [
+                text for chat_id, text in handled if chat_id == peer_id
+            ] == [
+                "0",
+                "1",
+                "2",
+            ]
+        assert not store.bots_manager.chat_locks
+
+    async def test_chats_are_handled_concurrently(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        active = 0
+        max_active = 0
+
+        async def dispatch(chat_id: int, update: Update) -> None:
+            nonlocal active, max_active
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        monkeypatch.setattr(store.bots_manager, "_dispatch", dispatch)
+        updates = [make_update(peer_id, "/help") for peer_id in range(10)]
+
+        await store.bots_manager.handle_updates(updates)
+
+        assert max_active == 10
+
+    async def test_updates_within_chat_are_ordered_across_calls(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        handled = []
+
+        async def dispatch(chat_id: int, update: Update) -> None:
+            await asyncio.sleep(
+                0.01 if update.object.message.text == "0" else 0
+            )
+            handled.append(update.object.message.text)
+
+        monkeypatch.setattr(store.bots_manager, "_dispatch", dispatch)
+
+        await asyncio.gather(
+            *(
+                store.bots_manager.handle_update(make_update(1, str(number)))
+                for number in range(5)
+            )
+        )
+
+        assert handled == ["0", "1", "2", "3", "4"]
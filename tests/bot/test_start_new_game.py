@@ -0,0 +1,63 @@
+import asyncio
+import random
+
+import pytest
+
+from app.bot.bot_messages import NEW_GAME_PERMISSION_MESSAGE
+from app.bot.states.base.context import StateContext
+from app.chats.models import ChatState
+from app.games.models import GameStatus
+from app.store import Store
+from app.vk_api.dataclasses import Message, Profile
+from app.vk_api.errors import VkApiError
+
+
+class TestStartNewGameState:
+    async def test_members_page_failure_cancels_game(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        chat_id = random.randint(2000000001, 2100000000)
+        sent = []
+
+        async def iter_chat_members(peer_id: int):
+            await asyncio.sleep(0)
+            yield [
+                Profile(
+                    id=user_id,
+                    screen_name=f"id{user_id}",
+                    photo_100=f"https://vk.test/{user_id}.jpg",
+                )
+                for user_id in (1, 2, 3)
+            ]
+            raise VkApiError({"error": {"error_code": 917}})
+
+        async def send_message(
+            message: Message, peer_id: int, keyboard=None
+        ) -> None:
+            await asyncio.sleep(0)
+            sent.append(message.text)
+
+        monkeypatch.setattr(
+            store.vk_api, "iter_chat_members", iter_chat_members
+        )
+        monkeypatch.setattr(store.vk_api, "send_message", send_message)
+        await store.chats.get_or_create_chat(chat_id=chat_id)
+        await store.chats.update_bot_state(
+            chat_id=chat_id, new_state=ChatState.start_new_game
+        )
+        context = StateContext(store.app, chat_id)
+        state = await context.get_state()
+
+        await state.on_state_enter(from_state=ChatState.idle)
+
+        assert sent[0] == NEW_GAME_PERMISSION_MESSAGE
+        assert await store.chats.get_bot_state(chat_id) == ChatState.idle
+        assert (
+            await store.games.get_game_by_status(
+                chat_id=chat_id, status=GameStatus.in_progress
+            )
+            is None
+        )
+        assert await store.games.get_game_by_status(
+            chat_id=chat_id, status=GameStatus.canceled
+        )
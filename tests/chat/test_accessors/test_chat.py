@@ -1,8 +1,12 @@
+import random
+
+import pytest
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.chats.models import ChatModel
+from app.chats.models import ChatModel, ChatState
 from app.store import Store
+from app.web.config import UpdatesMode
 
 
 class TestChatAccessor:
@@ -47,3 +51,56 @@ class TestChatAccessor:
         assert db_chat is not None
         assert db_chat.chat_id == chat.chat_id
         assert db_chat.chat_id == 200000001
+
+    async def test_bot_state_is_cached(self, store: Store) -> None:
+        chat_id = random.randint(2000000001, 2100000000)
+        stats = store.chats.states.stats
+        hits, misses = stats.hits, stats.misses
+
+        first = await store.chats.get_bot_state(chat_id=chat_id)
+        second = await store.chats.get_bot_state(chat_id=chat_id)
+
+        assert first == second == ChatState.init
+        assert stats.misses - misses == 1
+        assert stats.hits - hits == 1
+
+    async def test_update_bot_state_writes_through(
+        self, db_sessionmaker: async_sessionmaker[AsyncSession], store: Store
+    ) -> None:
+        chat_id = random.randint(2000000001, 2100000000)
+        await store.chats.get_bot_state(chat_id=chat_id)
+        misses = store.chats.states.stats.misses
+
+        await store.chats.update_bot_state(
+            chat_id=chat_id, new_state=ChatState.idle
+        )
+
+        assert (
+            await store.chats.get_bot_state(chat_id=chat_id) == ChatState.idle
+        )
+        assert store.chats.states.stats.misses == misses
+        async with db_sessionmaker() as session:
+            db_chat = await session.get(ChatModel, chat_id)
+        assert db_chat.bot_state == ChatState.idle
+
+    async def test_bot_state_is_not_cached_in_callback_mode(
+        self,
+        db_sessionmaker: async_sessionmaker[AsyncSession],
+        store: Store,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(
+            store.app.config.bot, "updates_mode", UpdatesMode.callback
+        )
+        chat_id = random.randint(2000000001, 2100000000)
+        await store.chats.get_bot_state(chat_id=chat_id)
+        # Another replica moves the chat on.
+        async with db_sessionmaker() as session:
+            db_chat = await session.get(ChatModel, chat_id)
+            db_chat.bot_state = ChatState.idle
+            await session.commit()
+
+        assert (
+            await store.chats.get_bot_state(chat_id=chat_id) == ChatState.idle
+        )
+        assert chat_id not in store.chats.states
@@ -0,0 +1,22 @@
+import random
+
+from app.store import Store
+
+
+class TestCheckpointAccessor:
+    async def test_save_ts(self, store: Store) -> None:
+        group_id = random.randint(1, 2**62)
+
+        assert await store.checkpoints.get_ts(group_id) is None
+
+        await store.checkpoints.save_ts(group_id, 10)
+
+        assert await store.checkpoints.get_ts(group_id) == 10
+
+    async def test_save_ts_never_moves_back(self, store: Store) -> None:
+        group_id = random.randint(1, 2**62)
+
+        await store.checkpoints.save_ts(group_id, 20)
+        await store.checkpoints.save_ts(group_id, 15)
+
+        assert await store.checkpoints.get_ts(group_id) == 20
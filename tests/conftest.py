@@ -82,6 +82,7 @@ async def clear_db(application: Application) -> Iterator[None]:
     except Exception:
         logging.warning("Ошибка при тестировании")
     finally:
+        application.store.chats.states.clear()
         async_session = AsyncSession(application.database.engine)
         async with async_session.begin():
             connection = await async_session.connection()
@@ -0,0 +1,148 @@
+from sqlalchemy import event, text
+
+from app.games.models import GameStatus
+from app.players.models import PlayerStatus
+from app.store import Store
+from app.web.app import Application
+
+FIRST_CHAT_ID = 100000000
+CHATS = 1000
+GAMES_PER_CHAT = 10
+PLAYERS_PER_GAME = 20
+CHAT_ID = FIRST_CHAT_ID + 1
+FIRST_USER_ID = 1001
+# Each chat's last game is in progress, its first two players are the pair.
+SEED_SQL = (
+    """
+    INSERT INTO chats (chat_id, bot_state)
+    SELECT :first_chat_id + chat, 'game_processing'
+    FROM generate_series(1, :chats) AS chat
+    """,
+    """
+    INSERT INTO games (chat_id, status, current_round)
+    SELECT
+        :first_chat_id + chat,
+        CAST(
+            CASE WHEN game = :games THEN 'in_progress' ELSE 'finished' END
+            AS gamestatus
+        ),
+        1
+    FROM generate_series(1, :games) AS game,
+        generate_series(1, :chats) AS chat
+    """,
+    """
+    INSERT INTO players (user_id, username, avatar_url, game_id, status)
+    SELECT
+        (games.chat_id - :first_chat_id) * 1000 + player,
+        'id' || ((games.chat_id - :first_chat_id) * 1000 + player),
+        'https://vk.test/avatar.jpg',
+        games.id,
+        CAST(
+            CASE
+                WHEN games.status = 'finished' AND player = 1 THEN 'winner'
+                WHEN games.status = 'finished' THEN 'loser'
+                WHEN player <= 2 THEN 'in_game'
+                ELSE 'voting'
+            END
+            AS playerstatus
+        )
+    FROM games, generate_series(1, :players) AS player
+    WHERE games.chat_id - :first_chat_id BETWEEN 1 AND :chats
+    """,
+    "ANALYZE chats, games, players",
+)
+
+
+class TestQueryPlans:
+    async def test_hot_queries_use_indexes(
+        self, application: Application, store: Store
+    ) -> None:
+        database = application.database
+        statements = []
+
+        def record(conn, cursor, statement, parameters, *args) -> None:
+            statements.append((statement, parameters))
+
+        # Everything runs in one unit that is rolled back, so the seeded
+        # rows are never committed.
+        async with database.unit_of_work() as unit:
+            for statement in SEED_SQL:
+                await unit.execute(
+                    text(statement),
+                    {
+                        "first_chat_id": FIRST_CHAT_ID,
+                        "chats": CHATS,
+                        "games": GAMES_PER_CHAT,
+                        "players": PLAYERS_PER_GAME,
+                    },
+                )
+            game = await store.games.get_game_by_status(
+                chat_id=CHAT_ID, status=GameStatus.in_progress
+            )
+            candidate, _ = await store.players.get_players_by_status(
+                game_id=game.id, status=PlayerStatus.in_game
+            )
+            calls = {
+                "get_game_by_status": lambda: store.games.get_game_by_status(
+                    chat_id=CHAT_ID, status=GameStatus.in_progress
+                ),
+                "get_last_game": lambda: store.games.get_last_game(
+                    chat_id=CHAT_ID
+                ),
+                "get_player_by_user_id": lambda: (
+                    store.players.get_player_by_user_id(
+                        game_id=game.id, user_id=FIRST_USER_ID + 2
+                    )
+                ),
+                "get_players_by_status": lambda: (
+                    store.players.get_players_by_status(
+                        game_id=game.id, status=PlayerStatus.in_game
+                    )
+                ),
+                "get_players_by_round": lambda: (
+                    store.players.get_players_by_round(
+                        current_round=1,
+                        game_id=game.id,
+                        status=PlayerStatus.voting,
+                    )
+                ),
+                "cast_vote": lambda: store.players.cast_vote(
+                    game_id=game.id,
+                    user_id=FIRST_USER_ID + 2,
+                    player_id=candidate.id,
+                ),
+                "get_round_result": lambda: store.players.get_round_result(
+                    game_id=game.id
+                ),
+                "set_players_in_game": lambda: (
+                    store.players.set_players_in_game(
+                        game_id=game.id,
+                        player_ids=[FIRST_USER_ID, FIRST_USER_ID + 1],
+                    )
+                ),
+            }
+
+            plans = {}
+            connection = await unit.connection()
+            for name, call in calls.items():
+                event.listen(
+                    database.engine.sync_engine, "before_cursor_execute", record
+                )
+                try:
+                    await call()
+                finally:
+                    event.remove(
+                        database.engine.sync_engine,
+                        "before_cursor_execute",
+                        record,
+                    )
+                statement, parameters = statements.pop()
+                result = await connection.exec_driver_sql(
+                    f"EXPLAIN {statement}", parameters
+                )
+                plans[name] = "\n".join(row[0] for row in result)
+            await unit.rollback()
+
+        for name, plan in plans.items():
+            assert "Seq Scan" not in plan, f"{name}:\n{plan}"
+            assert "Index" in plan, f"{name}:\n{plan}"
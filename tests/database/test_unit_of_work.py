@@ -0,0 +1,122 @@
+import asyncio
+import random
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.chats.models import ChatModel, ChatState
+from app.store import Store
+from app.web.app import Application
+
+
+def random_chat_id() -> int:
+    return random.randint(2000000001, 2100000000)
+
+
+class TestUnitOfWork:
+    async def test_accessors_share_one_transaction(
+        self,
+        application: Application,
+        db_sessionmaker: async_sessionmaker[AsyncSession],
+        store: Store,
+    ) -> None:
+        database = application.database
+        chat_id = random_chat_id()
+        units = database.stats.units
+
+        async with database.unit_of_work() as unit:
+            await store.chats.get_or_create_chat(chat_id=chat_id)
+            await store.chats.update_bot_state(
+                chat_id=chat_id, new_state=ChatState.idle
+            )
+            assert database.session() is unit
+            async with database.sessionmaker() as session:
+                assert await session.get(ChatModel, chat_id) is None
+
+        async with db_sessionmaker() as session:
+            chat = await session.get(ChatModel, chat_id)
+        assert chat.bot_state == ChatState.idle
+        assert database.stats.units == units + 1
+        assert database.stats.last_statements >= 3
+
+    async def test_error_rolls_back_the_whole_unit(
+        self, application: Application, store: Store
+    ) -> None:
+        database = application.database
+        chat_id = random_chat_id()
+
+        async def fail() -> None:
+            async with database.unit_of_work():
+                await store.chats.get_or_create_chat(chat_id=chat_id)
+                await store.chats.update_bot_state(
+                    chat_id=chat_id, new_state=ChatState.idle
+                )
+                raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            await fail()
+
+        assert await store.chats.get_by_chat_id(chat_id=chat_id) is None
+        assert chat_id not in store.chats.states
+
+    async def test_rollback_drops_state_cached_on_miss(
+        self, application: Application, store: Store
+    ) -> None:
+        database = application.database
+        chat_id = random_chat_id()
+
+        async def fail() -> None:
+            async with database.unit_of_work():
+                assert (
+                    await store.chats.get_bot_state(chat_id=chat_id)
+                    == ChatState.init
+                )
+                raise RuntimeError
+
+        with pytest.raises(RuntimeError):
+            await fail()
+
+        assert chat_id not in store.chats.states
+        assert await store.chats.get_by_chat_id(chat_id=chat_id) is None
+
+    async def test_spawned_tasks_use_their_own_sessions(
+        self, application: Application
+    ) -> None:
+        database = application.database
+
+        async def session_in_task():
+            await asyncio.sleep(0)
+            return database.session()
+
+        async with database.unit_of_work() as unit:
+            session = await asyncio.create_task(session_in_task())
+
+        assert session is not unit
+        await session.close()
+
+    async def test_units_leave_overflow_to_other_sessions(
+        self,
+        application: Application,
+        store: Store,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        database = application.database
+        monkeypatch.setattr(database, "units", asyncio.Semaphore(1))
+        chat_id = random_chat_id()
+        entered = asyncio.Event()
+
+        async def second_unit() -> None:
+            async with database.unit_of_work():
+                entered.set()
+
+        async with database.unit_of_work():
+            task = asyncio.create_task(second_unit())
+            # A subtask still gets a connection while units are capped.
+            await asyncio.create_task(
+                store.chats.get_or_create_chat(chat_id=chat_id)
+            )
+            await asyncio.sleep(0.01)
+            assert not entered.is_set()
+
+        await task
+        assert entered.is_set()
@@ -1,8 +1,13 @@
+import asyncio
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.games.models import GameModel
+from app.players.dataclasses import RoundPlayer, VoteResult
 from app.players.models import PlayerModel
 from app.store import Store
+from app.vk_api.dataclasses import Profile
 
 
 class TestGameAccessor:
@@ -30,6 +35,37 @@ class TestGameAccessor:
         assert db_player.id == player.id
         assert db_player.game_id == game.id
 
+    async def test_create_players(
+        self, db_sessionmaker: async_sessionmaker[AsyncSession], store: Store
+    ) -> None:
+        await store.chats.get_or_create_chat(chat_id=200000001)
+        game = await store.games.create_game(chat_id=200000001)
+        players = await store.players.create_players(
+            profiles=[
+                Profile(
+                    id=user_id,
+                    screen_name=f"id{user_id}",
+                    photo_100=f"https://vk.test/{user_id}.jpg",
+                )
+                for user_id in (1, 2, 3)
+            ],
+            game_id=game.id,
+        )
+
+        assert [player.user_id for player in players] == [1, 2, 3]
+
+        async with db_sessionmaker() as session:
+            result = await session.execute(
+                select(PlayerModel).where(PlayerModel.game_id == game.id)
+            )
+            db_players = result.scalars().all()
+
+        assert sorted(player.username for player in db_players) == [
+            "id1",
+            "id2",
+            "id3",
+        ]
+
     async def test_get_player_by_id(
         self, db_sessionmaker: async_sessionmaker[AsyncSession], store: Store
     ) -> None:
@@ -56,3 +92,93 @@ class TestGameAccessor:
         assert db_player is not None
         assert db_player.id == player.id
         assert db_player.game_id == game.id
+
+    async def test_cast_vote(self, store: Store) -> None:
+        game, voters, candidate = await self._voting_game(store)
+
+        vote = await store.players.cast_vote(
+            game_id=game.id, user_id=voters[0].user_id, player_id=candidate.id
+        )
+
+        assert vote == VoteResult(accepted=True, votes=1, all_voted=False)
+        voter = await store.players.get_player_by_id(player_id=voters[0].id)
+        assert voter.is_voted
+
+        vote = await store.players.cast_vote(
+            game_id=game.id, user_id=voters[1].user_id, player_id=candidate.id
+        )
+
+        assert vote == VoteResult(accepted=True, votes=2, all_voted=True)
+
+    async def test_cast_vote_counts_once(self, store: Store) -> None:
+        game, voters, candidate = await self._voting_game(store)
+
+        votes = await asyncio.gather(
+            *(
+                store.players.cast_vote(
+                    game_id=game.id,
+                    user_id=voters[0].user_id,
+                    player_id=candidate.id,
+                )
+                for _ in range(3)
+            )
+        )
+
+        assert sum(vote.accepted for vote in votes) == 1
+        candidate = await store.players.get_player_by_id(player_id=candidate.id)
+        assert candidate.votes == 1
+
+    async def test_cast_vote_rejects_non_candidate(self, store: Store) -> None:
+        game, voters, _ = await self._voting_game(store)
+
+        vote = await store.players.cast_vote(
+            game_id=game.id, user_id=voters[0].user_id, player_id=voters[1].id
+        )
+
+        assert vote == VoteResult(accepted=False, votes=None, all_voted=False)
+
+    async def test_get_round_result(self, store: Store) -> None:
+        game, voters, candidate = await self._voting_game(store)
+        await store.players.cast_vote(
+            game_id=game.id, user_id=voters[0].user_id, player_id=candidate.id
+        )
+
+        round_result = await store.players.get_round_result(game_id=game.id)
+
+        assert (round_result.voted, round_result.eligible) == (1, 2)
+        assert not round_result.all_voted
+        assert round_result.winner == RoundPlayer(
+            id=candidate.id, username=candidate.username, votes=1
+        )
+        assert round_result.loser.votes == 0
+        assert round_result.loser.id != candidate.id
+        assert not round_result.is_tie
+
+    async def test_get_round_result_tie_keeps_pair(self, store: Store) -> None:
+        game, _, _ = await self._voting_game(store)
+
+        round_result = await store.players.get_round_result(game_id=game.id)
+
+        assert round_result.is_tie
+        assert round_result.winner.id < round_result.loser.id
+
+    async def _voting_game(
+        self, store: Store
+    ) -> tuple[GameModel, list[PlayerModel], PlayerModel]:
+        await store.chats.get_or_create_chat(chat_id=200000001)
+        game = await store.games.create_game(chat_id=200000001)
+        players = await store.players.create_players(
+            profiles=[
+                Profile(
+                    id=user_id,
+                    screen_name=f"id{user_id}",
+                    photo_100=f"https://vk.test/{user_id}.jpg",
+                )
+                for user_id in (1, 2, 3, 4)
+            ],
+            game_id=game.id,
+        )
+        candidates = await store.players.set_players_in_game(
+            game_id=game.id, player_ids=[1, 2]
+        )
+        return game, players[2:], candidates[0]
@@ -0,0 +1,42 @@
+from app.vk_api.batcher import build_execute_code, split_execute_response
+from app.vk_api.errors import VkApiError
+
+
+class TestExecuteBatcher:
+    def test_build_execute_code(self) -> None:
+        code = build_execute_code(
+            [
+                (
+                    "messages.send",
+                    {"peer_id": 1, "message": "Привет", "access_token": "t"},
+                ),
+                ("messages.sendMessageEventAnswer", {"event_id": "e", "v": 1}),
+            ]
+        )
+
+        assert code == (
+            "return ["
+            'API.messages.send({"peer_id":1,"message":"Привет"}),'
+            'API.messages.sendMessageEventAnswer({"event_id":"e"})'
+            "];"
+        )
+
+    def test_split_execute_response(self) -> None:
+        results = split_execute_response(
+            {
+                "response": [10, False, 1],
+                "execute_errors": [
+                    {
+                        "method": "messages.send",
+                        "error_code": 901,
+                        "error_msg": "Can't send messages",
+                    }
+                ],
+            },
+            3,
+        )
+
+        assert results[0] == {"response": 10}
+        assert isinstance(results[1], VkApiError)
+        assert results[1].error_code == 901
+        assert results[2] == {"response": 1}
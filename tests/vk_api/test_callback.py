@@ -0,0 +1,97 @@
+import pytest
+from aiohttp.test_utils import TestClient
+
+from app.store import Store
+from app.vk_api.poller import UpdateQueue
+from app.web.config import UpdatesMode
+
+
+@pytest.fixture
+def update_queue(store: Store, monkeypatch: pytest.MonkeyPatch) -> UpdateQueue:
+    config = store.app.config.bot
+    monkeypatch.setattr(config, "updates_mode", UpdatesMode.callback)
+    monkeypatch.setattr(config, "group_id", "1")
+    monkeypatch.setattr(config, "callback_secret", "secret")
+    monkeypatch.setattr(config, "callback_confirmation", "confirm-me")
+    queue = UpdateQueue(store, maxsize=10, workers=1)
+    monkeypatch.setattr(store.vk_api, "update_queue", queue)
+    return queue
+
+
+def make_body(**kwargs) -> dict:
+    return {"group_id": 1, "secret": "secret", **kwargs}
+
+
+class TestCallbackView:
+    async def test_confirmation(
+        self, cli: TestClient, update_queue: UpdateQueue
+    ) -> None:
+        response = await cli.post(
+            "/vk.callback", json=make_body(type="confirmation")
+        )
+
+        assert response.status == 200
+        assert await response.text() == "confirm-me"
+
+    async def test_update_is_queued(
+        self, cli: TestClient, update_queue: UpdateQueue
+    ) -> None:
+        response = await cli.post(
+            "/vk.callback",
+            json=make_body(
+                type="message_new",
+                event_id="abc",
+                object={
+                    "message": {
+                        "from_id": 1,
+                        "text": "/start",
+                        "id": 1,
+                        "peer_id": 2000000001,
+                    }
+                },
+            ),
+        )
+
+        assert await response.text() == "ok"
+        item = update_queue.queue.get_nowait()
+        assert item.update.type == "message_new"
+        assert item.update.object.message.peer_id == 2000000001
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            make_body(type="message_new", secret="wrong"),
+            make_body(type="message_new", group_id=2),
+        ],
+    )
+    async def test_foreign_requests_are_rejected(
+        self, cli: TestClient, update_queue: UpdateQueue, body: dict
+    ) -> None:
+        response = await cli.post("/vk.callback", json=body)
+
+        assert response.status == 403
+        assert update_queue.depth == 0
+
+    async def test_non_object_body_is_rejected(
+        self, cli: TestClient, update_queue: UpdateQueue
+    ) -> None:
+        response = await cli.post("/vk.callback", json=[make_body()])
+
+        assert response.status == 400
+
+    async def test_not_found_in_long_poll_mode(
+        self,
+        cli: TestClient,
+        update_queue: UpdateQueue,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(
+            cli.app.config.bot, "updates_mode", UpdatesMode.long_poll
+        )
+
+        response = await cli.post(
+            "/vk.callback", json=make_body(type="message_new")
+        )
+
+        assert response.status == 404
+        assert update_queue.depth == 0
@@ -0,0 +1,95 @@
+import pytest
+
+from app.vk_api.decoder import decode_update, decode_updates
+from app.vk_api.schemas import UpdateSchema
+
+MESSAGE = {
+    "date": 1713370123,
+    "from_id": 273460215,
+    "id": 0,
+    "out": 0,
+    "peer_id": 2000000003,
+    "text": "/start",
+    "conversation_message_id": 412,
+}
+
+UPDATES = [
+    {
+        "type": "message_new",
+        "event_id": "2b1c0f6e",
+        "object": {"message": MESSAGE, "client_info": {"keyboard": True}},
+    },
+    {
+        "type": "message_new",
+        "object": {
+            "message": {
+                **MESSAGE,
+                "text": "",
+                "action": {"type": "chat_invite_user", "member_id": 8143},
+            }
+        },
+    },
+    {
+        "type": "message_new",
+        "object": {
+            "message": {**MESSAGE, "action": {"type": "chat_title_update"}}
+        },
+    },
+    {
+        "type": "message_event",
+        "object": {
+            "user_id": 273460215,
+            "peer_id": 2000000003,
+            "event_id": "f1a2b3c4d5e6",
+            "payload": {"button": "vote_first"},
+            "conversation_message_id": 414,
+        },
+    },
+    {
+        "type": "message_event",
+        "object": {
+            "user_id": 273460215,
+            "peer_id": 2000000003,
+            "event_id": "a9b8c7d6e5f4",
+            "payload": {"button": "mariya.k", "player_id": 58},
+        },
+    },
+    {"type": "group_join", "object": {"user_id": 1, "join_type": "join"}},
+    {"type": "message_new", "object": {"message": {**MESSAGE, "id": "7"}}},
+    {
+        "type": "message_new",
+        "object": {
+            "message": {
+                **MESSAGE,
+                "action": {"type": "chat_kick_user", "member_id": None},
+            }
+        },
+    },
+]
+
+INVALID_UPDATES = [
+    {"type": "message_new", "object": {"message": {**MESSAGE, "text": 1}}},
+    {"type": "message_new", "object": {"message": {**MESSAGE, "action": None}}},
+    {"type": "message_event", "object": {"payload": '{"button": "vote"}'}},
+    {"type": "message_new", "object": "message"},
+    {"type": "message_event", "object": {"payload": {}}},
+    {"object": {}},
+]
+
+
+class TestDecodeUpdate:
+    @pytest.mark.parametrize("update", UPDATES)
+    def test_matches_schema(self, update: dict) -> None:
+        assert decode_update(update) == UpdateSchema().load(update)
+
+    @pytest.mark.parametrize("update", INVALID_UPDATES)
+    def test_errors_match_schema(self, update: dict) -> None:
+        with pytest.raises(Exception) as schema_error:  # noqa: PT011
+            UpdateSchema().load(update)
+        with pytest.raises(schema_error.type):
+            decode_update(update)
+
+    def test_decode_updates(self) -> None:
+        assert decode_updates(UPDATES) == [
+            UpdateSchema().load(update) for update in UPDATES
+        ]
@@ -0,0 +1,239 @@
+import random
+
+import pytest
+from aiohttp import web
+
+from app.store import Store
+from app.vk_api.transport import VkTransport
+from app.web.config import UpdatesMode
+
+
+class FakeLongPollServer:
+    def __init__(self) -> None:
+        self.handshakes = 0
+        self.requests: list[dict] = []
+        self.responses: list[dict | None] = []
+        self.url = ""
+
+    async def handshake(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.handshakes += 1
+        return web.json_response(
+            {
+                "response": {
+                    "key": f"key{self.handshakes}",
+                    "server": self.url,
+                    "ts": "100",
+                }
+            }
+        )
+
+    async def long_poll(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.requests.append(dict(request.query))
+        response = self.responses.pop(0)
+        if response is None:
+            return web.Response(status=502, text="Bad Gateway")
+        return web.json_response(response)
+
+
+@pytest.fixture
+async def fake_long_poll(
+    aiohttp_server, store: Store, monkeypatch: pytest.MonkeyPatch
+):
+    fake = FakeLongPollServer()
+    app = web.Application()
+    app.router.add_route(
+        "*", "/method/groups.getLongPollServer", fake.handshake
+    )
+    app.router.add_get("/long_poll", fake.long_poll)
+    server = await aiohttp_server(app)
+    fake.url = str(server.make_url("/long_poll"))
+
+    vk_api = store.vk_api
+    transport = vk_api.transport
+    vk_api.transport = VkTransport(
+        token="token", api_path=str(server.make_url("/method/"))
+    )
+    vk_api.transport.connect()
+    monkeypatch.setattr(vk_api, "key", None)
+    monkeypatch.setattr(vk_api, "server", None)
+    monkeypatch.setattr(vk_api, "ts", None)
+    monkeypatch.setattr(store.app.config.bot, "long_poll_max_backoff", 0)
+    yield fake
+    await vk_api.transport.close()
+    vk_api.transport = transport
+
+
+class TestLongPoll:
+    async def test_outdated_ts_is_updated_without_handshake(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        fake_long_poll.responses = [
+            {"failed": 1, "ts": "150"},
+            {"ts": "151", "updates": []},
+        ]
+
+        updates = await store.vk_api.poll()
+
+        assert updates == []
+        assert fake_long_poll.handshakes == 1
+        assert [r["ts"] for r in fake_long_poll.requests] == ["100", "150"]
+        assert store.vk_api.ts == "151"
+
+    async def test_expired_key_keeps_ts(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        fake_long_poll.responses = [
+            {"ts": "120", "updates": []},
+            {"failed": 2},
+            {"ts": "121", "updates": []},
+        ]
+
+        await store.vk_api.poll()
+        await store.vk_api.poll()
+
+        assert fake_long_poll.handshakes == 2
+        assert [(r["key"], r["ts"]) for r in fake_long_poll.requests] == [
+            ("key1", "100"),
+            ("key1", "120"),
+            ("key2", "120"),
+        ]
+
+    async def test_lost_information_gets_full_refresh(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        fake_long_poll.responses = [
+            {"ts": "120", "updates": []},
+            {"failed": 3},
+            {"ts": "101", "updates": []},
+        ]
+
+        await store.vk_api.poll()
+        await store.vk_api.poll()
+
+        assert [(r["key"], r["ts"]) for r in fake_long_poll.requests] == [
+            ("key1", "100"),
+            ("key1", "120"),
+            ("key2", "100"),
+        ]
+        assert store.vk_api.long_poll_stats.lost_sessions >= 1
+
+    async def test_refresh_failures_back_off(
+        self,
+        store: Store,
+        fake_long_poll: FakeLongPollServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        backoffs = []
+
+        def long_poll_backoff(failures: int) -> float:
+            backoffs.append(failures)
+            return 0
+
+        monkeypatch.setattr(
+            store.vk_api, "_long_poll_backoff", long_poll_backoff
+        )
+        fake_long_poll.responses = [
+            {"failed": 2},
+            {"failed": 3},
+            {"failed": 1, "ts": "110"},
+            {"failed": 2},
+            {"ts": "111", "updates": []},
+        ]
+
+        await store.vk_api.poll()
+
+        assert backoffs == [1, 2, 3]
+        assert fake_long_poll.handshakes == 4
+
+    async def test_unknown_failure_keeps_session(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        fake_long_poll.responses = [
+            {"ts": "120", "updates": []},
+            {"failed": 4},
+            {"ts": "121", "updates": []},
+        ]
+
+        await store.vk_api.poll()
+        await store.vk_api.poll()
+
+        assert fake_long_poll.handshakes == 1
+        assert [(r["key"], r["ts"]) for r in fake_long_poll.requests] == [
+            ("key1", "100"),
+            ("key1", "120"),
+            ("key1", "120"),
+        ]
+
+    async def test_network_errors_are_retried_in_place(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        fake_long_poll.responses = [None, None, {"ts": "101", "updates": []}]
+
+        await store.vk_api.poll()
+
+        assert fake_long_poll.handshakes == 1
+        assert len(fake_long_poll.requests) == 3
+
+    async def test_resume_from_checkpoint(
+        self,
+        store: Store,
+        fake_long_poll: FakeLongPollServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        group_id = random.randint(1, 2**62)
+        monkeypatch.setattr(store.app.config.bot, "group_id", group_id)
+        await store.checkpoints.save_ts(group_id, 90)
+        replayed = store.vk_api.long_poll_stats.replayed
+        fake_long_poll.responses = [{"ts": "101", "updates": []}]
+
+        await store.vk_api._resume_long_poll()
+        await store.vk_api.poll()
+
+        assert fake_long_poll.requests[0]["ts"] == "90"
+        assert store.vk_api.long_poll_stats.replayed - replayed == 10
+
+    async def test_cold_start_uses_server_ts(
+        self,
+        store: Store,
+        fake_long_poll: FakeLongPollServer,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(
+            store.app.config.bot, "group_id", random.randint(1, 2**62)
+        )
+        replayed = store.vk_api.long_poll_stats.replayed
+        fake_long_poll.responses = [{"ts": "101", "updates": []}]
+
+        await store.vk_api._resume_long_poll()
+        await store.vk_api.poll()
+
+        assert fake_long_poll.requests[0]["ts"] == "100"
+        assert store.vk_api.long_poll_stats.replayed == replayed
+
+    async def test_connect_requires_group_id(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        config = store.app.config.bot
+        monkeypatch.setattr(config, "group_id", None)
+        monkeypatch.setattr(config, "updates_mode", UpdatesMode.long_poll)
+        monkeypatch.setattr(store.vk_api, "session", None)
+        monkeypatch.setattr(store.vk_api.transport, "connect", lambda: None)
+
+        with pytest.raises(ValueError, match="GROUP_ID"):
+            await store.vk_api.connect(store.app)
+
+    async def test_outdated_checkpoint_counts_skipped_updates(
+        self, store: Store, fake_long_poll: FakeLongPollServer
+    ) -> None:
+        store.vk_api.ts = 40
+        skipped = store.vk_api.long_poll_stats.skipped
+        fake_long_poll.responses = [
+            {"failed": 1, "ts": "100"},
+            {"ts": "101", "updates": []},
+        ]
+
+        await store.vk_api.poll()
+
+        assert store.vk_api.long_poll_stats.skipped - skipped == 60
@@ -0,0 +1,113 @@
+import pytest
+from aiohttp import web
+
+from app.store import Store
+from app.vk_api.dataclasses import Profile
+from app.vk_api.transport import VkTransport
+
+MEMBER_IDS = [101, 102, 103, 104, -224886734]
+
+
+class FakeMembersServer:
+    def __init__(self) -> None:
+        self.requests: list[dict] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await request.read()
+        params = dict(request.query)
+        self.requests.append(params)
+        offset, count = int(params["offset"]), int(params["count"])
+        page = MEMBER_IDS[offset : offset + count]
+        response = {
+            "count": len(MEMBER_IDS),
+            "items": [{"member_id": member_id} for member_id in page],
+        }
+        profiles = [
+            {
+                "id": member_id,
+                "screen_name": f"id{member_id}",
+                "photo_100": f"https://vk.test/{member_id}.jpg",
+                "first_name": "Имя",
+            }
+            for member_id in page
+            if member_id > 0
+        ]
+        if profiles:
+            response["profiles"] = profiles
+        return web.json_response({"response": response})
+
+
+@pytest.fixture
+async def fake_members(aiohttp_server, store: Store):
+    fake = FakeMembersServer()
+    app = web.Application()
+    app.router.add_get("/method/messages.getConversationMembers", fake.handle)
+    server = await aiohttp_server(app)
+
+    vk_api = store.vk_api
+    transport = vk_api.transport
+    vk_api.transport = VkTransport(
+        token="token", api_path=str(server.make_url("/method/"))
+    )
+    vk_api.transport.connect()
+    yield fake
+    await vk_api.transport.close()
+    await vk_api.scheduler.stop()
+    vk_api.transport = transport
+
+
+class TestChatMembers:
+    async def test_members_are_fetched_page_by_page(
+        self, store: Store, fake_members: FakeMembersServer
+    ) -> None:
+        pages = [
+            page
+            async for page in store.vk_api.iter_chat_members(
+                peer_id=2000000001, page_size=2
+            )
+        ]
+
+        assert pages == [
+            [
+                Profile(
+                    id=101,
+                    screen_name="id101",
+                    photo_100="https://vk.test/101.jpg",
+                ),
+                Profile(
+                    id=102,
+                    screen_name="id102",
+                    photo_100="https://vk.test/102.jpg",
+                ),
+            ],
+            [
+                Profile(
+                    id=103,
+                    screen_name="id103",
+                    photo_100="https://vk.test/103.jpg",
+                ),
+                Profile(
+                    id=104,
+                    screen_name="id104",
+                    photo_100="https://vk.test/104.jpg",
+                ),
+            ],
+            [],
+        ]
+        assert [r["offset"] for r in fake_members.requests] == ["0", "2", "4"]
+        assert {r["fields"] for r in fake_members.requests} == {
+            "screen_name,photo_100"
+        }
+
+    async def test_get_chat_members(
+        self, store: Store, fake_members: FakeMembersServer
+    ) -> None:
+        members = await store.vk_api.get_chat_members(peer_id=2000000001)
+
+        assert [profile.id for profile in members.profiles] == [
+            101,
+            102,
+            103,
+            104,
+        ]
+        assert len(fake_members.requests) == 1
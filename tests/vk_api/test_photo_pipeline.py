@@ -0,0 +1,149 @@
+import asyncio
+import uuid
+
+import pytest
+
+from app.store import Store
+from app.vk_api.dataclasses import Photo, UploadPhoto
+from app.vk_api.errors import TOO_MANY_REQUESTS, VkApiError
+
+
+@pytest.fixture
+def fake_vk_api(store: Store, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    calls = []
+
+    async def upload_photo(image_url: str, hasher=None) -> UploadPhoto:
+        calls.append(f"upload {image_url}")
+        if image_url == "broken":
+            raise VkApiError({"error": {"error_code": 100}})
+        await asyncio.sleep(0.05)
+        if hasher is not None:
+            hasher.update(image_url.encode())
+        return UploadPhoto(server=1, photo=image_url, hash="hash")
+
+    async def save_photo(upload_photo: UploadPhoto) -> Photo:
+        calls.append(f"save {upload_photo.photo}")
+        await asyncio.sleep(0.05)
+        return Photo(album_id=1, id=len(upload_photo.photo), owner_id=1)
+
+    monkeypatch.setattr(store.vk_api, "upload_photo", upload_photo)
+    monkeypatch.setattr(store.vk_api, "save_photo", save_photo)
+    return calls
+
+
+class TestPhotoPipeline:
+    async def test_prepare_photos_runs_avatars_concurrently(
+        self, store: Store, fake_vk_api: list[str]
+    ) -> None:
+        pipeline = store.vk_api.photo_pipeline
+
+        photos = await pipeline.prepare_photos(["a", "bb"], use_cache=False)
+
+        assert [photo.id for photo in photos] == [1, 2]
+        assert pipeline.stats.stage("total").last < 0.25
+        for stage in ("transfer", "save"):
+            assert pipeline.stats.stage(stage).count >= 2
+
+    async def test_prepare_photos_cancels_other_legs_on_error(
+        self, store: Store, fake_vk_api: list[str]
+    ) -> None:
+        with pytest.raises(VkApiError):
+            await store.vk_api.photo_pipeline.prepare_photos(
+                ["a", "broken"], use_cache=False
+            )
+
+        assert "save a" not in fake_vk_api
+
+    async def test_cached_avatar_skips_upload(
+        self, store: Store, fake_vk_api: list[str]
+    ) -> None:
+        image_url = f"https://vk.test/{uuid.uuid4()}.jpg"
+        pipeline = store.vk_api.photo_pipeline
+
+        first_photo, from_cache = await pipeline.prepare_photo(image_url)
+        assert not from_cache
+
+        store.avatars.cache.clear()
+        fake_vk_api.clear()
+        second_photo, from_cache = await pipeline.prepare_photo(image_url)
+
+        assert from_cache
+        assert second_photo == first_photo
+        assert fake_vk_api == []
+
+    async def test_send_photos_reuploads_rejected_cached_photos(
+        self,
+        store: Store,
+        fake_vk_api: list[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        image_urls = [f"https://vk.test/{uuid.uuid4()}.jpg" for _ in range(2)]
+        pipeline = store.vk_api.photo_pipeline
+        await pipeline.prepare_photos(image_urls)
+        fake_vk_api.clear()
+        sent = []
+
+        async def send_photos(photos, peer_id: int) -> None:
+            await asyncio.sleep(0)
+            if not sent:
+                sent.append(None)
+                raise VkApiError({"error": {"error_code": 100}})
+            sent.append(photos)
+
+        monkeypatch.setattr(store.vk_api, "send_photos", send_photos)
+
+        await pipeline.send_photos(image_urls, peer_id=2000000001)
+
+        assert len(sent) == 2
+        assert sum(call.startswith("upload") for call in fake_vk_api) == 2
+
+    async def test_reupload_inside_unit_of_work(
+        self,
+        store: Store,
+        fake_vk_api: list[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        image_urls = [f"https://vk.test/{uuid.uuid4()}.jpg" for _ in range(2)]
+        pipeline = store.vk_api.photo_pipeline
+        await pipeline.prepare_photos(image_urls)
+        sent = []
+
+        async def send_photos(photos, peer_id: int) -> None:
+            await asyncio.sleep(0)
+            if not sent:
+                sent.append(None)
+                raise VkApiError({"error": {"error_code": 100}})
+            sent.append(photos)
+
+        monkeypatch.setattr(store.vk_api, "send_photos", send_photos)
+
+        # The re-upload tasks save from their own sessions, so nothing the
+        # handler's unit holds may block them.
+        async with store.app.database.unit_of_work(), asyncio.timeout(5):
+            await pipeline.send_photos(image_urls, peer_id=2000000001)
+
+        assert len(sent) == 2
+
+    async def test_send_photos_keeps_cache_on_transient_errors(
+        self,
+        store: Store,
+        fake_vk_api: list[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        image_urls = [f"https://vk.test/{uuid.uuid4()}.jpg" for _ in range(2)]
+        pipeline = store.vk_api.photo_pipeline
+        await pipeline.prepare_photos(image_urls)
+        fake_vk_api.clear()
+
+        async def send_photos(photos, peer_id: int) -> None:
+            await asyncio.sleep(0)
+            raise VkApiError({"error": {"error_code": TOO_MANY_REQUESTS}})
+
+        monkeypatch.setattr(store.vk_api, "send_photos", send_photos)
+
+        with pytest.raises(VkApiError):
+            await pipeline.send_photos(image_urls, peer_id=2000000001)
+
+        assert fake_vk_api == []
+        for image_url in image_urls:
+            assert await store.avatars.get_by_avatar_url(image_url)
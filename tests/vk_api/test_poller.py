@@ -0,0 +1,161 @@
+import asyncio
+import random
+
+import pytest
+
+from app.store import Store
+from app.vk_api.dataclasses import Update, UpdateMessage, UpdateObject
+from app.vk_api.poller import CheckpointTracker, UpdateQueue
+
+
+def make_update(peer_id: int) -> Update:
+    return Update(
+        type="message_new",
+        object=UpdateObject(
+            message=UpdateMessage(
+                from_id=1, text="/help", id=1, peer_id=peer_id
+            )
+        ),
+    )
+
+
+class TestUpdateQueue:
+    async def test_consumers_handle_every_update(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        handled = []
+
+        async def handle_update(update: Update) -> None:
+            await asyncio.sleep(0.01)
+            handled.append(update.object.message.peer_id)
+
+        monkeypatch.setattr(store.bots_manager, "handle_update", handle_update)
+        queue = UpdateQueue(store, maxsize=100, workers=10)
+        queue.start()
+
+        for peer_id in range(20):
+            await queue.put(make_update(peer_id))
+        await queue.stop()
+
+        assert sorted(handled) == list(range(20))
+        assert queue.stats.enqueued == 20
+        assert queue.stats.handled == 20
+        assert queue.stats.max_lag > 0
+        assert queue.depth == 0
+
+    async def test_put_waits_when_queue_is_full(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        release = asyncio.Event()
+
+        async def handle_update(update: Update) -> None:
+            await release.wait()
+
+        monkeypatch.setattr(store.bots_manager, "handle_update", handle_update)
+        queue = UpdateQueue(store, maxsize=2, workers=1)
+        queue.start()
+
+        await queue.put(make_update(0))
+        await asyncio.sleep(0.01)
+        await queue.put(make_update(1))
+        await queue.put(make_update(2))
+        blocked_put = asyncio.create_task(queue.put(make_update(3)))
+        await asyncio.sleep(0.01)
+
+        assert not blocked_put.done()
+        assert queue.depth == 2
+        assert queue.stats.backpressure_waits == 1
+
+        release.set()
+        await blocked_put
+        await queue.stop()
+
+        assert queue.stats.handled == 4
+
+    async def test_hot_chat_does_not_hold_up_quiet_chat(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        hot_chat, quiet_chat = 1, 2
+        release = asyncio.Event()
+        handled = []
+
+        async def dispatch(chat_id: int, update: Update) -> None:
+            if chat_id == hot_chat:
+                await release.wait()
+            handled.append(chat_id)
+
+        monkeypatch.setattr(store.bots_manager, "_dispatch", dispatch)
+        queue = UpdateQueue(store, maxsize=10, workers=2)
+        queue.start()
+
+        for _ in range(5):
+            await queue.put(make_update(hot_chat))
+        await queue.put(make_update(quiet_chat))
+        await asyncio.sleep(0.01)
+
+        assert handled == [quiet_chat]
+        assert queue.depth == 4
+
+        release.set()
+        await queue.stop()
+
+        assert handled == [quiet_chat] + [hot_chat] * 5
+        assert not queue.backlogs
+
+    async def test_failed_update_does_not_stop_consumer(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def handle_update(update: Update) -> None:
+            await asyncio.sleep(0)
+            if update.object.message.peer_id == 0:
+                raise RuntimeError
+
+        monkeypatch.setattr(store.bots_manager, "handle_update", handle_update)
+        queue = UpdateQueue(store, maxsize=10, workers=1)
+        queue.start()
+
+        await queue.put(make_update(0))
+        await queue.put(make_update(1))
+        await queue.stop()
+
+        assert queue.stats.handled == 2
+        assert queue.stats.failed == 1
+
+    async def test_checkpoint_follows_fully_handled_batches(
+        self, store: Store, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        group_id = random.randint(1, 2**62)
+        release = asyncio.Event()
+
+        async def handle_update(update: Update) -> None:
+            if update.object.message.peer_id == 0:
+                await release.wait()
+
+        monkeypatch.setattr(store.bots_manager, "handle_update", handle_update)
+        monkeypatch.setattr(store.app.config.bot, "group_id", group_id)
+        queue = UpdateQueue(store, maxsize=10, workers=2)
+        queue.start()
+
+        await queue.put_batch([make_update(0), make_update(1)], ts=11)
+        await queue.put_batch([make_update(2)], ts=12)
+        await asyncio.sleep(0.01)
+
+        assert await store.checkpoints.get_ts(group_id) is None
+
+        release.set()
+        await queue.stop()
+
+        assert await store.checkpoints.get_ts(group_id) == 12
+
+
+class TestCheckpointTracker:
+    def test_watermark_waits_for_oldest_batch(self) -> None:
+        tracker = CheckpointTracker()
+        tracker.add(11, 2)
+        tracker.add(12, 1)
+
+        assert tracker.done(12) is None
+        assert tracker.done(11) is None
+        assert tracker.done(11) == 12
+        assert tracker.add(12, 0) is None
+        assert tracker.add(13, 0) == 13
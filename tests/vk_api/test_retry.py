@@ -0,0 +1,103 @@
+import pytest
+from aiohttp import web
+
+from app.store import Store
+from app.vk_api.dataclasses import Message, UploadPhoto
+from app.vk_api.errors import CircuitOpenError, VkApiError
+from app.vk_api.retry import CircuitBreaker, CircuitState, RetryPolicy
+from app.vk_api.transport import VkTransport
+
+
+class FakeVkServer:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.failures = 0
+        self.status = 200
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await request.read()
+        self.calls.append(request.match_info["method"])
+        if self.status != 200:
+            return web.Response(status=self.status, text="Bad Gateway")
+        if self.failures:
+            self.failures -= 1
+            return web.json_response(
+                {"error": {"error_code": 10, "error_msg": "Internal error"}}
+            )
+        return web.json_response({"response": 1})
+
+
+@pytest.fixture
+async def fake_vk(aiohttp_server, store: Store):
+    fake = FakeVkServer()
+    app = web.Application()
+    app.router.add_route("*", "/method/{method}", fake.handle)
+    server = await aiohttp_server(app)
+
+    vk_api = store.vk_api
+    transport, retry = vk_api.transport, vk_api.retry
+    vk_api.transport = VkTransport(
+        token="token", api_path=str(server.make_url("/method/"))
+    )
+    vk_api.transport.connect()
+    vk_api.retry = RetryPolicy(
+        max_retries=3,
+        base_delay=0.001,
+        max_delay=0.01,
+        breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60),
+    )
+    yield fake
+    await vk_api.transport.close()
+    await vk_api.scheduler.stop()
+    vk_api.transport, vk_api.retry = transport, retry
+
+
+class TestRetryPolicy:
+    async def test_idempotent_call_is_retried(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        fake_vk.failures = 2
+
+        await store.vk_api.send_message(Message(text="Привет"), peer_id=1)
+
+        assert fake_vk.calls == ["messages.send"] * 3
+        assert store.vk_api.retry.stats.retries == 2
+        assert store.vk_api.retry.breaker.state == CircuitState.closed
+
+    async def test_non_idempotent_call_is_not_retried(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        fake_vk.failures = 1
+
+        with pytest.raises(VkApiError):
+            await store.vk_api.save_photo(
+                UploadPhoto(server=1, photo="photo", hash="hash")
+            )
+
+        assert fake_vk.calls == ["photos.saveMessagesPhoto"]
+        assert store.vk_api.retry.stats.gave_up == 1
+
+    async def test_circuit_opens_while_api_is_degraded(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        fake_vk.status = 502
+
+        for _ in range(2):
+            with pytest.raises(CircuitOpenError):
+                await store.vk_api.send_message(
+                    Message(text="Привет"), peer_id=1
+                )
+
+        assert len(fake_vk.calls) == 3
+        assert store.vk_api.retry.breaker.state == CircuitState.open
+        assert store.vk_api.retry.stats.circuit_opened == 1
+        assert store.vk_api.retry.stats.rejected == 2
+
+    def test_breaker_lets_one_trial_call_after_reset_timeout(self) -> None:
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitState.closed
@@ -0,0 +1,125 @@
+import pytest
+from aiohttp import web
+
+from app.store import Store
+from app.vk_api.dataclasses import Action, Message
+from app.vk_api.errors import CHAT_ACCESS_DENIED, VkApiError
+from app.vk_api.roster import RosterCache
+from app.vk_api.transport import VkTransport
+
+PEER_ID = 2000000001
+
+
+def make_profile(user_id: int) -> dict:
+    return {
+        "id": user_id,
+        "screen_name": f"id{user_id}",
+        "photo_100": f"https://vk.test/{user_id}.jpg",
+    }
+
+
+class FakeVkServer:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+
+    async def handle(self, request: web.Request) -> web.Response:
+        await request.read()
+        method = request.match_info["method"]
+        self.calls.append(method)
+        if method == "messages.send":
+            return web.json_response(
+                {"error": {"error_code": CHAT_ACCESS_DENIED, "error_msg": ""}}
+            )
+        if method == "users.get":
+            user_id = int(request.query["user_ids"])
+            return web.json_response({"response": [make_profile(user_id)]})
+        return web.json_response(
+            {
+                "response": {
+                    "count": 3,
+                    "items": [{"member_id": i} for i in (1, 2, 3)],
+                    "profiles": [make_profile(i) for i in (1, 2, 3)],
+                }
+            }
+        )
+
+
+@pytest.fixture
+async def fake_vk(aiohttp_server, store: Store):
+    fake = FakeVkServer()
+    app = web.Application()
+    app.router.add_get("/method/{method}", fake.handle)
+    server = await aiohttp_server(app)
+
+    vk_api = store.vk_api
+    transport = vk_api.transport
+    vk_api.transport = VkTransport(
+        token="token", api_path=str(server.make_url("/method/"))
+    )
+    vk_api.transport.connect()
+    yield fake
+    await vk_api.transport.close()
+    await vk_api.scheduler.stop()
+    vk_api.transport = transport
+
+
+async def roster_ids(roster: RosterCache) -> list[int]:
+    return sorted(
+        [
+            profile.id
+            async for page in roster.iter_profiles(PEER_ID)
+            for profile in page
+        ]
+    )
+
+
+class TestRosterCache:
+    async def test_known_chat_needs_no_members_call(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        roster = RosterCache(store.vk_api, maxsize=10, ttl=60)
+
+        assert await roster_ids(roster) == [1, 2, 3]
+        assert await roster_ids(roster) == [1, 2, 3]
+        assert fake_vk.calls == ["messages.getConversationMembers"]
+
+    async def test_roster_follows_chat_actions(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        roster = RosterCache(store.vk_api, maxsize=10, ttl=60)
+        await roster_ids(roster)
+
+        await roster.apply_action(
+            PEER_ID, Action(type="chat_invite_user", member_id=4), from_id=1
+        )
+        await roster.apply_action(
+            PEER_ID, Action(type="chat_kick_user", member_id=2), from_id=1
+        )
+
+        assert await roster_ids(roster) == [1, 3, 4]
+        assert fake_vk.calls == ["messages.getConversationMembers", "users.get"]
+        assert roster.stats.invites == 1
+        assert roster.stats.kicks == 1
+
+    async def test_roster_is_revalidated_after_ttl(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        roster = RosterCache(store.vk_api, maxsize=10, ttl=0)
+
+        await roster_ids(roster)
+        await roster_ids(roster)
+
+        assert fake_vk.calls == ["messages.getConversationMembers"] * 2
+        assert roster.stats.revalidations == 1
+
+    async def test_permission_error_drops_roster(
+        self, store: Store, fake_vk: FakeVkServer
+    ) -> None:
+        roster = store.vk_api.roster
+        await roster_ids(roster)
+        assert roster.get(PEER_ID) is not None
+
+        with pytest.raises(VkApiError):
+            await store.vk_api.send_message(Message(text="hi"), peer_id=PEER_ID)
+
+        assert roster.get(PEER_ID) is None
@@ -0,0 +1,187 @@
+import asyncio
+import time
+
+from app.vk_api.errors import (
+    TOO_MANY_REQUESTS,
+    SchedulerStoppedError,
+    VkApiError,
+)
+from app.vk_api.scheduler import OutboundScheduler
+
+
+class TestOutboundScheduler:
+    async def test_rate_limit(self) -> None:
+        async def send(method: str, params: dict) -> dict:
+            await asyncio.sleep(0)
+            return {"response": params["n"]}
+
+        scheduler = OutboundScheduler(send, rate=20)
+        started_at = time.monotonic()
+
+        results = await asyncio.gather(
+            *(
+                scheduler.submit("messages.send", {"n": n}, peer_id=1)
+                for n in range(30)
+            )
+        )
+        await scheduler.stop()
+
+        assert [result["response"] for result in results] == list(range(30))
+        assert time.monotonic() - started_at >= 0.45
+        assert scheduler.stats.sent == 30
+        assert scheduler.stats.max_queue_wait >= 0.45
+
+    async def test_busy_chat_does_not_starve_others(self) -> None:
+        sent = []
+
+        async def send(method: str, params: dict) -> dict:
+            await asyncio.sleep(0)
+            sent.append(params["peer_id"])
+            return {"response": 1}
+
+        scheduler = OutboundScheduler(send, rate=1000)
+        busy = [
+            scheduler.submit("messages.send", {"peer_id": 1}, peer_id=1)
+            for _ in range(10)
+        ]
+        quiet = scheduler.submit("messages.send", {"peer_id": 2}, peer_id=2)
+
+        await asyncio.gather(*busy, quiet)
+        await scheduler.stop()
+
+        assert sent.index(2) <= 1
+
+    async def test_event_answers_have_priority(self) -> None:
+        sent = []
+
+        async def send(method: str, params: dict) -> dict:
+            await asyncio.sleep(0)
+            sent.append(method)
+            return {"response": 1}
+
+        scheduler = OutboundScheduler(send, rate=1000)
+        calls = [
+            scheduler.submit("messages.send", {}, peer_id=peer_id)
+            for peer_id in range(5)
+        ]
+        calls.append(
+            scheduler.submit("messages.sendMessageEventAnswer", {}, peer_id=1)
+        )
+
+        await asyncio.gather(*calls)
+        await scheduler.stop()
+
+        assert sent[0] == "messages.sendMessageEventAnswer"
+
+    async def test_rate_limited_call_is_retried(self) -> None:
+        attempts = 0
+
+        async def send(method: str, params: dict) -> dict:
+            nonlocal attempts
+            await asyncio.sleep(0)
+            attempts += 1
+            if attempts == 1:
+                raise VkApiError({"error": {"error_code": TOO_MANY_REQUESTS}})
+            return {"response": 1}
+
+        scheduler = OutboundScheduler(send, rate=1000)
+
+        result = await scheduler.submit("messages.send", {}, peer_id=1)
+        await scheduler.stop()
+
+        assert result == {"response": 1}
+        assert scheduler.stats.rate_limit_hits == 1
+
+    async def test_calls_are_coalesced_into_execute(self) -> None:
+        requests = []
+
+        async def send(method: str, params: dict) -> dict:
+            await asyncio.sleep(0)
+            requests.append([(method, params)])
+            return {"response": params["n"]}
+
+        async def send_batch(calls: list[tuple[str, dict]]) -> list:
+            await asyncio.sleep(0)
+            requests.append(calls)
+            results = []
+            for _, params in calls:
+                if params["n"] == 3:
+                    results.append(VkApiError({"error": {"error_code": 100}}))
+                else:
+                    results.append({"response": params["n"]})
+            return results
+
+        scheduler = OutboundScheduler(
+            send, rate=1000, send_batch=send_batch, batch_size=25
+        )
+
+        results = await asyncio.gather(
+            *(
+                scheduler.submit("messages.send", {"n": n}, peer_id=n)
+                for n in range(30)
+            ),
+            return_exceptions=True,
+        )
+        await scheduler.stop()
+
+        assert [len(calls) for calls in requests] == [25, 5]
+        assert isinstance(results[3], VkApiError)
+        assert [result["response"] for result in results[4:]] == list(
+            range(4, 30)
+        )
+        assert scheduler.stats.requests == 2
+        assert scheduler.stats.calls_per_request == 15
+
+    async def test_one_request_in_flight_per_chat(self) -> None:
+        requests = []
+
+        async def send(method: str, params: dict) -> dict:
+            requests.append([params["n"]])
+            await asyncio.sleep(0.01)
+            return {"response": params["n"]}
+
+        async def send_batch(calls: list[tuple[str, dict]]) -> list:
+            requests.append([params["n"] for _, params in calls])
+            await asyncio.sleep(0.01)
+            return [{"response": params["n"]} for _, params in calls]
+
+        scheduler = OutboundScheduler(
+            send, rate=1000, send_batch=send_batch, batch_size=2
+        )
+        first = asyncio.create_task(
+            scheduler.submit("messages.send", {"n": 0}, peer_id=1)
+        )
+        await asyncio.sleep(0)
+        rest = [
+            scheduler.submit("messages.send", {"n": n}, peer_id=1)
+            for n in range(1, 4)
+        ]
+
+        await asyncio.gather(first, *rest)
+        await scheduler.stop()
+
+        assert requests == [[0], [1, 2], [3]]
+
+    async def test_stop_fails_queued_calls(self) -> None:
+        async def send(method: str, params: dict) -> dict:
+            await asyncio.sleep(0)
+            return {"response": 1}
+
+        scheduler = OutboundScheduler(send, rate=1)
+        calls = [
+            asyncio.create_task(
+                scheduler.submit("messages.send", {}, peer_id=peer_id)
+            )
+            for peer_id in range(3)
+        ]
+        answer = asyncio.create_task(
+            scheduler.submit("messages.sendMessageEventAnswer", {})
+        )
+        await asyncio.sleep(0.05)
+
+        await scheduler.stop()
+
+        assert scheduler.depth == 0
+        results = await asyncio.gather(*calls, answer, return_exceptions=True)
+        assert sum(isinstance(r, SchedulerStoppedError) for r in results) == 3
+        assert {"response": 1} in results
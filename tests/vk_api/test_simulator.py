@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientSession
+
+from app.store import Store
+from app.vk_api.dataclasses import Message, UploadPhoto
+from app.vk_api.errors import VkApiError
+from app.vk_api.simulator import VkSimulator, parse_execute_code
+from app.vk_api.transport import VkTransport
+
+PEER_ID = 2000000001
+
+
+@pytest.fixture
+async def simulator(
+    aiohttp_server, store: Store, monkeypatch: pytest.MonkeyPatch
+):
+    simulator = VkSimulator(chats=2, members=3)
+    server = await aiohttp_server(simulator.make_app())
+    simulator.base_url = str(server.make_url("")).rstrip("/")
+
+    vk_api = store.vk_api
+    transport = vk_api.transport
+    vk_api.transport = VkTransport(
+        token="token", api_path=f"{simulator.base_url}/method/"
+    )
+    monkeypatch.setattr(vk_api, "session", vk_api.transport.connect())
+    monkeypatch.setattr(vk_api, "key", None)
+    monkeypatch.setattr(vk_api, "server", None)
+    monkeypatch.setattr(vk_api, "ts", None)
+    yield simulator
+    await vk_api.transport.close()
+    await vk_api.scheduler.stop()
+    vk_api.transport = transport
+
+
+class TestVkSimulator:
+    def test_parse_execute_code(self) -> None:
+        assert parse_execute_code(
+            'return [API.messages.send({"message":"}),API.x("}),'
+            'API.users.get({"user_ids":1})];'
+        ) == [
+            ("messages.send", {"message": "}),API.x("}),
+            ("users.get", {"user_ids": 1}),
+        ]
+
+    async def test_long_poll_delivers_pushed_messages(
+        self, store: Store, simulator: VkSimulator
+    ) -> None:
+        await store.vk_api._get_long_poll_service()
+        await simulator.push_message(PEER_ID, from_id=100001, text="/start")
+
+        updates = await store.vk_api.poll()
+
+        assert [update.object.message.text for update in updates] == ["/start"]
+
+    async def test_calls_are_served_through_execute(
+        self, store: Store, simulator: VkSimulator
+    ) -> None:
+        await asyncio.gather(
+            *(
+                store.vk_api.send_message(Message(text="Привет"), peer_id)
+                for peer_id in range(PEER_ID, PEER_ID + 2)
+            ),
+            store.vk_api.get_chat_members(PEER_ID),
+        )
+
+        assert simulator.stats.messages_sent == 2
+        assert simulator.stats.calls["messages.getConversationMembers"] == 1
+
+    async def test_photo_upload_round_trip(
+        self, store: Store, simulator: VkSimulator
+    ) -> None:
+        await store.vk_api._get_messages_upload_service()
+
+        upload_photo = await store.vk_api.upload_photo(
+            f"{simulator.base_url}/avatars/100001.jpg"
+        )
+        photo = await store.vk_api.save_photo(upload_photo)
+
+        assert photo.id == 1
+        assert simulator.stats.photos_uploaded == 1
+
+    async def test_error_injection_and_rate_limit(
+        self, store: Store, simulator: VkSimulator
+    ) -> None:
+        simulator.error_rate = 1
+        with pytest.raises(VkApiError) as error:
+            await store.vk_api.save_photo(
+                UploadPhoto(server=1, photo="photo", hash="hash")
+            )
+        simulator.error_rate = 0
+
+        simulator.rate_limiter.rate = 1
+        async with ClientSession() as session:
+            for _ in range(2):
+                async with session.get(
+                    f"{simulator.base_url}/method/users.get?user_ids=1"
+                ) as response:
+                    data = await response.json()
+
+        assert error.value.error_code == 10
+        assert data["error"]["error_code"] == 6
+        assert simulator.stats.rate_limited == 1
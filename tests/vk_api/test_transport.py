@@ -0,0 +1,72 @@
+import pytest
+from aiohttp import web
+
+from app.vk_api.transport import API_VERSION, MAX_QUERY_LENGTH, VkTransport
+
+
+async def method_handler(request: web.Request) -> web.Response:
+    params = dict(request.query)
+    if request.method == "POST":
+        params.update(await request.post())
+    return web.json_response(
+        {"response": {"http_method": request.method, "params": params}}
+    )
+
+
+async def long_poll_handler(request: web.Request) -> web.Response:
+    await request.read()
+    return web.json_response({"ts": int(request.query["ts"]) + 1})
+
+
+@pytest.fixture
+async def transport(aiohttp_server):
+    app = web.Application()
+    app.router.add_route("*", "/method/{method}", method_handler)
+    app.router.add_get("/long_poll", long_poll_handler)
+    server = await aiohttp_server(app)
+    transport = VkTransport(
+        token="token", api_path=str(server.make_url("/method/"))
+    )
+    transport.connect()
+    transport.server_url = str(server.make_url("/long_poll"))
+    yield transport
+    await transport.close()
+
+
+class TestVkTransport:
+    async def test_small_params_are_sent_in_query(
+        self, transport: VkTransport
+    ) -> None:
+        data = await transport.call_api("messages.send", {"peer_id": 1})
+
+        assert data["response"] == {
+            "http_method": "GET",
+            "params": {
+                "peer_id": "1",
+                "access_token": "token",
+                "v": API_VERSION,
+            },
+        }
+
+    async def test_large_params_are_sent_in_form_body(
+        self, transport: VkTransport
+    ) -> None:
+        message = "x" * MAX_QUERY_LENGTH
+
+        data = await transport.call_api("messages.send", {"message": message})
+
+        assert data["response"]["http_method"] == "POST"
+        assert data["response"]["params"]["message"] == message
+        assert data["response"]["params"]["access_token"] == "token"
+
+    async def test_stats(self, transport: VkTransport) -> None:
+        for _ in range(3):
+            await transport.call_api("messages.send", {"peer_id": 1})
+        data = await transport.long_poll(transport.server_url, "key", 1)
+
+        assert data == {"ts": 2}
+        assert transport.stats.endpoint("messages.send").count == 3
+        assert transport.stats.endpoint("long_poll").count == 1
+        assert transport.stats.connections_created == 1
+        assert transport.stats.connections_reused == 3
+        assert transport.stats.reuse_rate == 0.75
@@ -0,0 +1,68 @@
+import pytest
+from aiohttp import ClientSession, web
+
+from app.store import Store
+from app.vk_api.errors import PhotoTooLargeError
+
+AVATAR = bytes(range(256)) * 1024
+
+
+async def avatar_handler(request: web.Request) -> web.StreamResponse:
+    response = web.StreamResponse()
+    await response.prepare(request)
+    for start in range(0, len(AVATAR), 4096):
+        await response.write(AVATAR[start : start + 4096])
+    return response
+
+
+async def upload_handler(request: web.Request) -> web.Response:
+    reader = await request.multipart()
+    part = await reader.next()
+    size = 0
+    while chunk := await part.read_chunk():
+        size += len(chunk)
+    return web.json_response(
+        {"server": 1, "photo": f"{part.filename}:{size}", "hash": "hash"}
+    )
+
+
+@pytest.fixture
+async def vk_upload_server(aiohttp_server, store: Store):
+    app = web.Application()
+    app.router.add_get("/avatar.jpg", avatar_handler)
+    app.router.add_post("/upload", upload_handler)
+    server = await aiohttp_server(app)
+    store.vk_api.session = ClientSession()
+    store.vk_api.upload_server = str(server.make_url("/upload"))
+    yield server
+    await store.vk_api.session.close()
+
+
+class TestUploadPhoto:
+    @pytest.mark.parametrize("stream", [True, False])
+    async def test_upload_photo(
+        self,
+        store: Store,
+        vk_upload_server,
+        monkeypatch: pytest.MonkeyPatch,
+        stream: bool,
+    ) -> None:
+        monkeypatch.setattr(
+            store.app.config.bot, "stream_photo_uploads", stream
+        )
+
+        upload_photo = await store.vk_api.upload_photo(
+            str(vk_upload_server.make_url("/avatar.jpg"))
+        )
+
+        assert upload_photo.photo == f"photo.jpg:{len(AVATAR)}"
+
+    async def test_upload_photo_rejects_large_photo(
+        self, store: Store, vk_upload_server, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(store.app.config.bot, "max_photo_size", 1024)
+
+        with pytest.raises(PhotoTooLargeError):
+            await store.vk_api.upload_photo(
+                str(vk_upload_server.make_url("/avatar.jpg"))
+            )